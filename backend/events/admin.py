@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from foodgram.paginators import LargeTableAdminMixin
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'topic', 'aggregate_id', 'created', 'processed_at', 'attempts')
+    list_filter = ('topic',)
+    readonly_fields = ('topic', 'aggregate_id', 'payload', 'created', 'processed_at', 'attempts', 'last_error')
@@ -0,0 +1,84 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)
+
+
+def handler(*topics):
+    """Регистрирует обработчик событий: @handler('recipe.created', ...).
+
+    Доставка «как минимум один раз»: при ошибке любого обработчика
+    событие повторяется целиком, поэтому обработчики должны быть
+    идемпотентными.
+    """
+    def decorator(func):
+        for topic in topics:
+            _handlers[topic].append(func)
+        return func
+    return decorator
+
+
+def dispatch_batch(batch_size=None):
+    """Обрабатывает одну пачку событий. Возвращает (успешно, с ошибкой)."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    done, failed = [], []
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(
+                processed_at__isnull=True,
+                available_at__lte=timezone.now(),
+                attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+            )
+            .order_by('id')[:batch_size]
+        )
+        for event in events:
+            try:
+                # Точка сохранения: ошибка обработчика не ломает всю пачку.
+                with transaction.atomic():
+                    for func in _handlers.get(event.topic, ()):
+                        func(event)
+            except Exception as exc:
+                logger.exception('Ошибка обработки события %s', event)
+                event.attempts += 1
+                event.last_error = repr(exc)
+                # Экспоненциальная пауза перед повтором: 2, 4, 8... секунд.
+                event.available_at = timezone.now() + timedelta(seconds=2 ** event.attempts)
+                failed.append(event)
+            else:
+                event.processed_at = timezone.now()
+                done.append(event)
+        OutboxEvent.objects.bulk_update(done, ['processed_at'])
+        OutboxEvent.objects.bulk_update(failed, ['attempts', 'last_error', 'available_at'])
+    return len(done), len(failed)
+
+
+def lag_stats():
+    """Метрики отставания: сколько событий ждёт и возраст самого старого.
+
+    Мёртвые события (исчерпавшие попытки) считаются отдельно в dead и не
+    влияют на pending и lag_seconds.
+    """
+    dead = Q(attempts__gte=settings.OUTBOX_MAX_ATTEMPTS)
+    stats = OutboxEvent.objects.filter(processed_at__isnull=True).aggregate(
+        pending=Count('id', filter=~dead),
+        dead=Count('id', filter=dead),
+        oldest=Min('created', filter=~dead)
+    )
+    oldest = stats.pop('oldest')
+    stats['lag_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
+
+
+def purge_processed(older_than):
+    return OutboxEvent.objects.filter(processed_at__lt=timezone.now() - older_than).delete()[0]
@@ -0,0 +1,49 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.dispatcher import dispatch_batch, lag_stats, purge_processed
+
+
+class Command(BaseCommand):
+    help = 'Раздаёт события из outbox зарегистрированным обработчикам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0, help='Пауза, когда событий нет, с')
+        parser.add_argument('--once', action='store_true', help='Обработать накопленное и выйти')
+        parser.add_argument('--stats', action='store_true', help='Только показать метрики отставания')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report(lag_stats())
+            return
+
+        total, started, last_report = 0, time.monotonic(), time.monotonic()
+        while True:
+            done, failed = dispatch_batch(options['batch_size'])
+            total += done
+            now = time.monotonic()
+            if now - last_report >= settings.OUTBOX_REPORT_INTERVAL or (options['once'] and not done):
+                stats = lag_stats()
+                stats['rate'] = total / (now - started) if now > started else 0.0
+                self._report(stats)
+                last_report = now
+                purge_processed(timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+            if failed:
+                self.stderr.write(f"Событий с ошибкой: {failed}")
+            if not done and not failed:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+
+    def _report(self, stats):
+        line = (
+            f"в очереди: {stats['pending']}, отставание: {stats['lag_seconds']:.1f} с, "
+            f"исчерпали попытки: {stats['dead']}"
+        )
+        if 'rate' in stats:
+            line += f", скорость: {stats['rate']:.1f} событий/с"
+        self.stdout.write(line)
@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """Событие об изменении данных, записанное в той же транзакции.
+
+    Диспетчер (manage.py dispatch_events) читает необработанные события
+    пачками и раздаёт их зарегистрированным обработчикам.
+    """
+    topic = models.CharField(max_length=64)
+    aggregate_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='outbox_pending_idx',
+                condition=models.Q(processed_at__isnull=True)
+            ),
+        ]
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self):
+        return f"#{self.id} {self.topic}({self.aggregate_id})"
+
+
+class Sequence(models.Model):
+    """Счётчик номеров, идущих в порядке фиксации транзакций (см. sequences)."""
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Последовательность'
+        verbose_name_plural = 'Последовательности'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
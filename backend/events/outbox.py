@@ -0,0 +1,20 @@
+from .models import OutboxEvent
+
+
+def emit(topic, aggregate_id, **payload):
+    """Записывает событие в outbox.
+
+    Вызывается внутри транзакции, в которой меняются данные: событие
+    фиксируется вместе с изменением или не фиксируется вовсе.
+    """
+    return OutboxEvent.objects.create(topic=topic, aggregate_id=aggregate_id, payload=payload)
+
+
+def emit_many(topic, events):
+    """Записывает пачку событий одной вставкой; events — пары (aggregate_id, payload).
+
+    Для bulk_create, который не вызывает сигналы моделей.
+    """
+    return OutboxEvent.objects.bulk_create(
+        OutboxEvent(topic=topic, aggregate_id=aggregate_id, payload=payload) for aggregate_id, payload in events
+    )
@@ -0,0 +1,29 @@
+"""Номера в порядке фиксации транзакций.
+
+Автоинкрементный id выдаётся при вставке, а не при фиксации: долгая
+транзакция получает меньший id, но фиксируется позже, и клиент, уже
+забравший записи с большими id, её пропустит. allocate() держит
+блокировку строки счётчика до конца транзакции, поэтому следующий номер
+выдаётся только после фиксации или отката предыдущего: читатели видят
+номера по порядку и без пропусков. На SQLite select_for_update ничего не
+делает, но там пишущие транзакции и так выполняются по одной.
+"""
+from django.db import transaction
+
+from .models import Sequence
+
+
+def allocate(name):
+    """Следующий номер последовательности name; только внутри transaction.atomic."""
+    if not transaction.get_connection().in_atomic_block:
+        # В автокоммите блокировка снялась бы раньше, чем зафиксируется запись с номером.
+        raise transaction.TransactionManagementError('Номер выдаётся только внутри транзакции.')
+    sequence, _ = Sequence.objects.select_for_update().get_or_create(name=name)
+    sequence.value += 1
+    sequence.save(update_fields=['value'])
+    return sequence.value
+
+
+def current(name):
+    """Последний зафиксированный номер последовательности name."""
+    return Sequence.objects.filter(name=name).values_list('value', flat=True).first() or 0
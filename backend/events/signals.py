@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import Favorite, Recipe, RecipeNeighbor, ShoppingCart
+from users.models import Subscription
+from .outbox import emit
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    emit('recipe.created' if created else 'recipe.updated', instance.id, author_id=instance.author_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # pre_delete: списки соседей с этим рецептом ещё не удалены каскадом.
+    listed_by = list(RecipeNeighbor.objects.filter(neighbor_id=instance.id).values_list('recipe_id', flat=True))
+    emit('recipe.deleted', instance.id, author_id=instance.author_id, listed_by=listed_by)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        emit('favorite.added', instance.recipe_id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    emit('favorite.removed', instance.recipe_id, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_added(sender, instance, created, **kwargs):
+    if created:
+        emit('cart.added', instance.recipe_id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_removed(sender, instance, **kwargs):
+    emit('cart.removed', instance.recipe_id, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        emit('subscription.created', instance.author_id, subscriber_id=instance.subscriber_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    emit('subscription.deleted', instance.author_id, subscriber_id=instance.subscriber_id)
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import sequences
+from .dispatcher import lag_stats
+from .models import OutboxEvent
+from .outbox import emit
+
+
+class SequenceTests(TransactionTestCase):
+    def test_numbers_are_consecutive_and_rollback_frees_them(self):
+        with transaction.atomic():
+            self.assertEqual(sequences.allocate('test'), 1)
+            self.assertEqual(sequences.allocate('test'), 2)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            sequences.allocate('test')
+            raise RuntimeError
+        self.assertEqual(sequences.current('test'), 2)
+        with transaction.atomic():
+            self.assertEqual(sequences.allocate('test'), 3)
+        self.assertEqual(sequences.current('other'), 0)
+
+    def test_allocation_requires_transaction(self):
+        with self.assertRaises(TransactionManagementError):
+            sequences.allocate('test')
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3)
+class LagStatsTests(TestCase):
+    def test_dead_events_do_not_count_as_lag(self):
+        dead = emit('recipe.updated', 1)
+        OutboxEvent.objects.filter(pk=dead.pk).update(attempts=3, created=timezone.now() - timedelta(days=1))
+        self.assertEqual(lag_stats(), {'pending': 0, 'dead': 1, 'lag_seconds': 0.0})
+
+        live = emit('recipe.updated', 2)
+        OutboxEvent.objects.filter(pk=live.pk).update(attempts=2, created=timezone.now() - timedelta(minutes=1))
+        stats = lag_stats()
+        self.assertEqual((stats['pending'], stats['dead']), (1, 1))
+        self.assertLess(stats['lag_seconds'], 3600)
+        self.assertGreaterEqual(stats['lag_seconds'], 60)
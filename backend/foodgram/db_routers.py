@@ -0,0 +1,82 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Вне HTTP-запроса (outbox, воркеры, команды) код сразу читает только что
+# записанное, поэтому по умолчанию чтение идёт с primary. Реплики получают
+# только безопасные запросы — их открепляет ReplicaPinningMiddleware.
+_pinned_to_primary = ContextVar('pinned_to_primary', default=True)
+
+PIN_COOKIE = 'db_primary'
+PIN_CACHE_PREFIX = 'db:pin:'
+
+
+class PrimaryReplicaRouter:
+    """Чтение — с реплик, запись и чтение сразу после записи — с primary.
+
+    С реплики читают только безопасные HTTP-запросы без недавней записи
+    и только вне транзакции на primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _pinned_to_primary.get() or not settings.DATABASE_REPLICAS:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            # Внутри транзакции читаем свои же незафиксированные записи.
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _pin_key(request):
+    # Токен-аутентификация DRF срабатывает уже во вьюхе, поэтому здесь
+    # клиента узнаём по заголовку Authorization, а не по request.user.
+    credentials = request.META.get('HTTP_AUTHORIZATION')
+    if not credentials:
+        return None
+    return PIN_CACHE_PREFIX + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes: после записи клиент какое-то время читает с primary.
+
+    Безопасный запрос клиента без недавней записи открепляется и читает с
+    реплики. Запрос с небезопасным методом целиком идёт в primary, а успешная
+    запись закрепляет клиента за primary на REPLICA_PIN_SECONDS — через
+    cookie и через ключ в кеше для клиентов с токеном.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = _pin_key(request)
+        is_write = request.method not in SAFE_METHODS
+        pinned = is_write or PIN_COOKIE in request.COOKIES or (key is not None and cache.get(key))
+        token = _pinned_to_primary.set(bool(pinned))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+
+        if is_write and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+            if key is not None:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+
+class Base64ImageField(serializers.ImageField):
+    """Base64ImageField из drf_extra_fields с отложенным импортом.
+
+    drf_extra_fields тянет filetype, а проверка изображения — Pillow;
+    они нужны только при загрузке картинки, а не при старте процесса
+    и не при чтении. Отдаётся поле как обычный ImageField (URL).
+    """
+
+    def to_internal_value(self, data):
+        if not hasattr(self, '_decoder'):
+            from drf_extra_fields.fields import Base64ImageField as Decoder
+            self._decoder = Decoder(*self._args, **self._kwargs)
+        return self._decoder.to_internal_value(data)
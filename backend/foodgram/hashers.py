@@ -0,0 +1,131 @@
+"""Хешеры паролей с параметрами из настроек и общим пулом потоков.
+
+Хеширование выполняется в ограниченном пуле PASSWORD_HASHING_WORKERS
+потоков процесса: Argon2, scrypt и PBKDF2 отпускают GIL, поэтому пул
+ограничивает, сколько ядер одновременно заняты паролями, а остальные
+запросы продолжают обслуживаться. Это только ограничение параллелизма
+внутри процесса: вызывающий поток ждёт результата. Под ASGI
+синхронные вьюхи входа и так выполняются вне event loop. Если пул и очередь заполнены дольше
+PASSWORD_HASHING_TIMEOUT, поднимается HashingOverloaded, и
+HashingOverloadedMiddleware отвечает 503 с Retry-After — и в API, и в
+админке.
+
+Параметры, отличные от параметров сохранённого хеша, приводят к его
+пересчёту при следующем успешном входе (must_update в Django).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .throttling import ServiceUnavailable
+
+
+class HashingOverloaded(Exception):
+    """Пул хеширования не освободился за PASSWORD_HASHING_TIMEOUT.
+
+    Исключение не из DRF: пароли проверяются и вне API (админка,
+    check_password в командах), где APIException превратился бы в 500.
+    """
+
+
+class HashingOverloadedMiddleware(MiddlewareMixin):
+    """Отвечает 503 с Retry-After на HashingOverloaded из любой вьюхи."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingOverloaded):
+            return None
+        response = JsonResponse({'detail': ServiceUnavailable.default_detail}, status=503)
+        response['Retry-After'] = str(settings.EXPENSIVE_REQUEST_RETRY_AFTER)
+        return response
+
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = None
+_slots = None
+
+
+def _mark_pool_thread():
+    _local.in_pool = True
+
+
+def _get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            _pool = ThreadPoolExecutor(workers, thread_name_prefix='hashing', initializer=_mark_pool_thread)
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE)
+    return _pool, _slots
+
+
+def _submit(func, *args, **kwargs):
+    pool, slots = _get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        raise HashingOverloaded
+    future = pool.submit(func, *args, **kwargs)
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def offload(func, *args, **kwargs):
+    """Выполняет func в пуле хеширования и ждёт результата."""
+    if getattr(_local, 'in_pool', False):
+        # Вложенный вызов (PBKDF2.verify вызывает encode) — уже в пуле.
+        return func(*args, **kwargs)
+    return _submit(func, *args, **kwargs).result()
+
+
+class PooledHasherMixin:
+    def encode(self, password, salt, *args, **kwargs):
+        return offload(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return offload(super().verify, password, encoded)
+
+
+class TunedArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self):
+        # OpenSSL по умолчанию ограничивает память 32 МиБ — меньше, чем
+        # нужно при work_factor от 2**15. Берём с запасом на проверку хешей
+        # с параметрами вдвое выше текущих.
+        return 2 * 128 * self.block_size * (self.work_factor + self.parallelism + 2)
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    pass
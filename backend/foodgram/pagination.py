@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset-пагинация по id: WHERE id > последнего на странице, без OFFSET."""
+    ordering = 'id'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class KeysetOrLimitOffsetPagination(LimitOffsetPagination):
+    """LimitOffset по умолчанию и keyset, если в запросе есть ?cursor=.
+
+    Пустой ?cursor= запрашивает первую страницу; ссылки next/previous
+    дальше содержат закодированную позицию. Стоимость страницы не растёт
+    с её номером, а общий COUNT(*) не выполняется.
+    """
+    keyset_class = IdCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
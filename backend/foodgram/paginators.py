@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Оценка числа строк всей таблицы по статистике PostgreSQL или None.
+
+    Оценивается только запрос без условий (changelist без фильтров и
+    поиска): reltuples из pg_class не читает саму таблицу. Оценка
+    планировщика для запроса с условиями может ошибаться на порядки,
+    поэтому для него None — и paginator делает точный COUNT.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # -1: таблицу ещё ни разу не анализировали.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших changelist админки.
+
+    Если changelist не отфильтрован и оценка размера таблицы превышает
+    ADMIN_EXACT_COUNT_LIMIT, точный COUNT(*) не выполняется и число
+    страниц считается по оценке. С фильтрами и поиском счёт точный.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+            return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """Настройки ModelAdmin для таблиц на миллионы строк."""
+    paginator = EstimatedCountPaginator
+    # Не считать отдельно полный размер таблицы при поиске и фильтрах.
+    show_full_result_count = False
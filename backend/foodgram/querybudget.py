@@ -0,0 +1,238 @@
+"""Бюджет SQL-запросов и времени для тестов и вьюх.
+
+QueryBudget считает запросы всех подключений внутри блока через
+connection.execute_wrapper. При превышении числа запросов или времени
+он пишет предупреждение в лог или падает с QueryBudgetExceeded, в
+зависимости от режима. Запросы дольше QUERY_BUDGET_SLOW_MS сохраняются
+вместе с планом EXPLAIN. Нарушения дописываются в QUERY_BUDGET_REPORT_FILE
+(NDJSON), а сводку по ним строит команда query_budget_report.
+
+Вьюхи объявляют свои бюджеты сами: QueryBudgetMixin для классов,
+декоратор query_budget для функций. Проверка в рантайме включается
+настройкой QUERY_BUDGET_MODE (off, log, raise).
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'log', 'raise')
+
+_report_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Блок выполнил больше запросов или шёл дольше, чем разрешено."""
+
+
+class QueryBudget:
+    """Ограничение числа SQL-запросов и времени блока.
+
+    Работает и как контекстный менеджер, и как декоратор. По умолчанию
+    режим 'raise' — так бюджет удобно проверять в тестах.
+    """
+
+    def __init__(self, queries=None, duration_ms=None, label=None, mode='raise'):
+        if mode not in MODES:
+            raise ValueError(f'Неизвестный режим бюджета: {mode}')
+        self.queries = queries
+        self.duration_ms = duration_ms
+        self.label = label
+        self.mode = mode
+        self.executed = []
+
+    def copy(self, **overrides):
+        options = {'queries': self.queries, 'duration_ms': self.duration_ms, 'label': self.label, 'mode': self.mode}
+        options.update(overrides)
+        return type(self)(**options)
+
+    def __call__(self, func):
+        label = self.label or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.copy(label=label):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self.executed = []
+        self._explaining = False
+        self._stack = ExitStack()
+        if self.mode != 'off':
+            for alias in connections:
+                self._stack.enter_context(connections[alias].execute_wrapper(self._wrapper(alias)))
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed_ms = (time.perf_counter() - self._started) * 1000
+        self._stack.close()
+        if self.mode == 'off' or exc_type is not None:
+            return False
+        self.check()
+        return False
+
+    def _wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            if self._explaining:
+                return execute(sql, params, many, context)
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.executed.append((alias, sql, params, many, (time.perf_counter() - start) * 1000))
+        return wrapper
+
+    @property
+    def count(self):
+        return len(self.executed)
+
+    def violations(self):
+        problems = []
+        if self.queries is not None and self.count > self.queries:
+            problems.append(f'{self.count} запросов при бюджете {self.queries}')
+        if self.duration_ms is not None and self.elapsed_ms > self.duration_ms:
+            problems.append(f'{self.elapsed_ms:.0f} мс при бюджете {self.duration_ms} мс')
+        return problems
+
+    def slow_queries(self):
+        threshold = settings.QUERY_BUDGET_SLOW_MS
+        slow = [row for row in self.executed if row[4] >= threshold]
+        slow.sort(key=lambda row: row[4], reverse=True)
+        return [
+            {'sql': sql, 'duration_ms': round(duration, 2), 'explain': self._explain(alias, sql, params, many)}
+            for alias, sql, params, many, duration in slow[:settings.QUERY_BUDGET_EXPLAIN_LIMIT]
+        ]
+
+    def repeated_queries(self):
+        """Одинаковые запросы, выполненные несколько раз, — признак N+1."""
+        counts = Counter(sql for _, sql, _, _, _ in self.executed)
+        return [{'sql': sql, 'count': count} for sql, count in counts.most_common(3) if count > 1]
+
+    def _explain(self, alias, sql, params, many):
+        connection = connections[alias]
+        if many or not sql.lstrip().upper().startswith('SELECT') or connection.needs_rollback:
+            return None
+        self._explaining = True
+        try:
+            # Точка сохранения: неудачный EXPLAIN не ломает транзакцию запроса.
+            with transaction.atomic(using=alias), connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        except DatabaseError:
+            return None
+        finally:
+            self._explaining = False
+
+    def check(self):
+        problems = self.violations()
+        slow = self.slow_queries()
+        if not problems and not slow:
+            return
+        record = {
+            'time': timezone.now().isoformat(),
+            'label': self.label or 'unlabeled',
+            'queries': self.count,
+            'queries_budget': self.queries,
+            'duration_ms': round(self.elapsed_ms, 2),
+            'duration_budget_ms': self.duration_ms,
+            'exceeded': bool(problems),
+            'slow': slow,
+            'repeated': self.repeated_queries(),
+        }
+        write_report(record)
+        if not problems:
+            logger.info('%s: медленные запросы (%d)', record['label'], len(slow))
+            return
+        message = f"{record['label']}: {'; '.join(problems)}"
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def write_report(record):
+    path = settings.QUERY_BUDGET_REPORT_FILE
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+    with _report_lock, open(path, 'a', encoding='utf-8') as report:
+        report.write(line)
+
+
+def runtime_budget(budget, label):
+    """Бюджет вьюхи в режиме из настроек или None, если проверка выключена."""
+    if budget is None or settings.QUERY_BUDGET_MODE == 'off':
+        return None
+    return budget.copy(label=label, mode=settings.QUERY_BUDGET_MODE)
+
+
+class QueryBudgetMixin:
+    """Бюджеты для APIView и ViewSet.
+
+    query_budgets сопоставляет действию вьюсета (list, retrieve, ...) или
+    HTTP-методу (get, post, ...) объект QueryBudget.
+    """
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        name = getattr(self, 'action_map', {}).get(method, method)
+        budget = runtime_budget(self.query_budgets.get(name), f'{type(self).__name__}.{name}')
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        with budget:
+            return super().dispatch(request, *args, **kwargs)
+
+
+def query_budget(queries=None, duration_ms=None):
+    """Бюджет функции-вьюхи; действует только при включённом QUERY_BUDGET_MODE."""
+    def decorator(view):
+        declared = QueryBudget(queries, duration_ms)
+        # У @api_view имя функции хранит сгенерированный класс вьюхи.
+        label = getattr(view, 'cls', view).__name__
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            budget = runtime_budget(declared, label)
+            if budget is None:
+                return view(request, *args, **kwargs)
+            with budget:
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize(records):
+    """Сводка нарушений: по вьюхам и по медленным запросам."""
+    views, queries = {}, {}
+    for record in records:
+        view = views.setdefault(record['label'], {
+            'label': record['label'], 'reports': 0, 'exceeded': 0, 'max_queries': 0, 'max_duration_ms': 0,
+        })
+        view['reports'] += 1
+        view['exceeded'] += record['exceeded']
+        view['max_queries'] = max(view['max_queries'], record['queries'])
+        view['max_duration_ms'] = max(view['max_duration_ms'], record['duration_ms'])
+        for slow in record['slow']:
+            query = queries.setdefault(slow['sql'], {
+                'sql': slow['sql'], 'count': 0, 'total_ms': 0, 'max_ms': 0, 'labels': set(), 'explain': None,
+            })
+            query['count'] += 1
+            query['total_ms'] += slow['duration_ms']
+            query['max_ms'] = max(query['max_ms'], slow['duration_ms'])
+            query['labels'].add(record['label'])
+            query['explain'] = slow['explain'] or query['explain']
+    return (
+        sorted(views.values(), key=lambda row: (row['exceeded'], row['reports']), reverse=True),
+        sorted(queries.values(), key=lambda row: row['total_ms'], reverse=True),
+    )
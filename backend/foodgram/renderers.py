@@ -0,0 +1,65 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работают стандартные классы DRF.
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+# U+2028 и U+2029 в UTF-8: в JavaScript это переводы строки, DRF их экранирует.
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def _default(obj):
+    # Всё, что orjson не умеет сам (lazy-строки, Decimal, datetime),
+    # кодируем так же, как стандартный JSONEncoder DRF.
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    """JSON как у JSONRenderer DRF (компактный, UTF-8), но через orjson.
+
+    Вывод совпадает байт-в-байт, кроме двух случаев: числа с плавающей
+    точкой в экспоненциальной записи (orjson пишет 1e16, DRF — 1e+16,
+    значение то же) и NaN/бесконечности (orjson пишет null, DRF в
+    строгом режиме падает с ValueError).
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    try:
+        content = orjson.dumps(
+            data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+    except TypeError:
+        # Целые шире 64 бит и прочее, что orjson не кодирует, — стандартным путём.
+        return JSONRenderer().render(data)
+    for raw, escaped in _LINE_SEPARATORS:
+        content = content.replace(raw, escaped)
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson; отличия в выводе описаны в dumps()."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, если он установлен."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
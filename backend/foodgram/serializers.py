@@ -0,0 +1,143 @@
+from operator import attrgetter
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
+# Поля, у которых to_representation не меняет значение, прочитанное из модели.
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+
+def _parse_list(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_sparse_fields(request):
+    """Разбирает ?fields= и ?expand= из запроса.
+
+    Возвращает (fields, expand): fields — множество запрошенных полей
+    или None, если ограничений нет; expand — множество вложенных полей,
+    которые нужно отдать целиком, а не только их id.
+    """
+    if request is None:
+        return None, set()
+    params = getattr(request, 'query_params', request.GET)
+    fields = params.get('fields')
+    expand = params.get('expand')
+    return (
+        _parse_list(fields) if fields else None,
+        _parse_list(expand) if expand else set(),
+    )
+
+
+class SparseFieldsetMixin:
+    """Оставляет в ответе только поля из ?fields=.
+
+    Вложенные поля из Meta.collapsed_fields при этом отдаются компактно
+    (обычно только id), если их нет в ?expand=. Без ?fields= ответ не
+    меняется. Ограничение применяется только к корневому сериализатору.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_sparse_root():
+            return fields
+        requested, expand = get_sparse_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+
+        collapsed = getattr(self.Meta, 'collapsed_fields', {})
+        sparse = {}
+        for name, field in fields.items():
+            if name not in requested:
+                continue
+            if name in collapsed and name not in expand:
+                field = collapsed[name]()
+                self.collapsed_names.add(name)
+            sparse[name] = field
+        return sparse
+
+    @property
+    def collapsed_names(self):
+        if not hasattr(self, '_collapsed_names'):
+            self._collapsed_names = set()
+        return self._collapsed_names
+
+    def _is_sparse_root(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+
+def file_url(value, request):
+    """То же, что FileField.to_representation при use_url=True."""
+    if not value:
+        return None
+    try:
+        url = value.url
+    except AttributeError:
+        return None
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def field_accessor(field):
+    """Готовит функцию (obj, state) -> значение поля, как в Serializer.to_representation."""
+    if type(field) in PLAIN_FIELDS and len(field.source_attrs) == 1:
+        getter = attrgetter(field.source_attrs[0])
+        return lambda obj, state: getter(obj)
+
+    def accessor(obj, state):
+        attribute = field.get_attribute(obj)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return accessor
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """Read-only список без пополевой обвязки DRF на каждой строке.
+
+    Дочерний сериализатор (FastPathMixin) один раз готовит функции доступа
+    к полям и общее для страницы состояние, после чего строки собираются
+    простыми словарями. Вывод совпадает с обычным ListSerializer.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return self.child.fast_representation(list(iterable))
+
+
+class FastPathMixin:
+    """Быстрый путь сериализации списков.
+
+    Метод fast_<поле>(obj, state) заменяет обработку поля в быстром пути;
+    prepare_rows(rows) один раз на страницу собирает state (например,
+    множества id вместо запроса на каждую строку).
+    """
+
+    def prepare_rows(self, rows):
+        return {}
+
+    def compile_accessors(self):
+        fields = self.fields
+        collapsed = getattr(self, 'collapsed_names', ())
+        accessors = []
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            fast = getattr(self, f'fast_{name}', None)
+            if fast is None or name in collapsed:
+                fast = field_accessor(field)
+            accessors.append((name, fast))
+        return accessors
+
+    def fast_representation(self, rows):
+        accessors = self.compile_accessors()
+        state = self.prepare_rows(rows)
+        return [{name: get(row, state) for name, get in accessors} for row in rows]
@@ -41,10 +41,14 @@ INSTALLED_APPS = [
     'djoser',
     'users',
     'recipes',
+    'events',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
+    'foodgram.db_routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.hashers.HashingOverloadedMiddleware',
 ]
 
 REST_FRAMEWORK = {
@@ -61,9 +66,48 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'foodgram.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'foodgram.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
+    # Token bucket для дорогих эндпоинтов: '<scope>_user' и '<scope>_ip'.
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_cart_download_user': '10/min',
+        'shopping_cart_download_ip': '30/min',
+        'recipe_create_user': '30/hour',
+        'recipe_create_ip': '60/hour',
+        'ingredient_catalog_user': '60/min',
+        'ingredient_catalog_ip': '120/min',
+    },
+}
+
+# Сколько дорогих запросов каждого вида может выполняться одновременно;
+# сверх бюджета — 503 с Retry-After.
+EXPENSIVE_REQUEST_BUDGETS = {
+    'shopping_cart_download': int(os.getenv('SHOPPING_CART_DOWNLOAD_BUDGET', 8)),
+    'recipe_create': int(os.getenv('RECIPE_CREATE_BUDGET', 8)),
+    'ingredient_catalog': int(os.getenv('INGREDIENT_CATALOG_BUDGET', 16)),
 }
+EXPENSIVE_REQUEST_RETRY_AFTER = 5
+EXPENSIVE_REQUEST_SLOT_TIMEOUT = 60
+
+# Сжатие ответов: brotli (если установлен) или gzip, начиная с порога.
+# text/html не сжимаем: в страницах админки есть CSRF-токен, а сжатие без
+# случайного дополнения открывает его для атаки BREACH.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'text/plain',
+)
 
 ROOT_URLCONF = 'foodgram.urls'
 
@@ -83,6 +127,21 @@ TEMPLATES = [
     },
 ]
 
+# Режим «только API» для автомасштабируемых подов: без админки, сообщений
+# и Browsable API. Меньше модулей импортируется при старте, меньше
+# middleware на каждый запрос. Админка обслуживается отдельным деплоем.
+API_ONLY = bool(os.getenv('API_ONLY'))
+if API_ONLY:
+    INSTALLED_APPS.remove('django.contrib.admin')
+    INSTALLED_APPS.remove('django.contrib.messages')
+    MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.messages.context_processors.messages')
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('foodgram.renderers.FastJSONRenderer',)
+
+# Бюджет холодного старта (импорт приложения и первый ответ), мс;
+# проверяется командой benchmark_startup.
+STARTUP_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', 1500))
+
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -106,9 +165,73 @@ DATABASES = {
     }
 }
 
+# Локальный запуск без PostgreSQL: DB_ENGINE=sqlite.
+if os.getenv("DB_ENGINE") == "sqlite":
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+    }
+
+# Реплики для чтения: DB_REPLICAS — хосты PostgreSQL через запятую
+# (для SQLite — пути к файлам). Без реплик всё идёт в default.
+DATABASE_REPLICAS = []
+for index, location in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dict(DATABASES["default"], TEST={"MIRROR": "default"})
+    if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[alias]["NAME"] = location.strip()
+    else:
+        DATABASES[alias]["HOST"] = location.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["foodgram.db_routers.PrimaryReplicaRouter"]
+
+# Сколько секунд после записи клиент читает с primary (read-your-writes).
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+
+# Кеш общий для всех процессов, если задан REDIS_URL: на нём держатся
+# троттлинг и лимиты одновременных запросов. Без REDIS_URL используется
+# LocMem, и эти лимиты считаются отдельно в каждом процессе.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+# Хеширование паролей. PASSWORD_HASHER выбирает основной алгоритм
+# (argon2, scrypt, pbkdf2), остальные нужны для проверки старых хешей —
+# они пересчитываются основным при следующем входе. В конце — хешеры из
+# прежнего списка Django по умолчанию, алгоритмов которых нет выше.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2')
+HASHERS = {
+    'argon2': 'foodgram.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'foodgram.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'foodgram.hashers.PooledPBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    HASHERS[PASSWORD_HASHER],
+    *(path for name, path in HASHERS.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+# Параметры по умолчанию — минимальные рекомендации OWASP.
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 19456))  # КиБ
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 1))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 15))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.getenv('PASSWORD_SCRYPT_BLOCK_SIZE', 8))
+PASSWORD_SCRYPT_PARALLELISM = int(os.getenv('PASSWORD_SCRYPT_PARALLELISM', 1))
+# Пул потоков хеширования: сколько паролей считается одновременно,
+# сколько ждёт в очереди и сколько секунд ждать места, прежде чем ответить 503.
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', 32))
+PASSWORD_HASHING_TIMEOUT = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -144,6 +267,83 @@ STATIC_ROOT = BASE_DIR / "collected_static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/media"
 
+# Медиа хранятся под хешем содержимого: одинаковые загрузки
+# дедуплицируются, а nginx отдаёт их с immutable-кешированием.
+STORAGES = {
+    "default": {
+        "BACKEND": "foodgram.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+# Файл без ссылок удаляется периодической задачей, если он старше этого
+# срока: ссылка на только что загруженный файл может быть ещё не зафиксирована.
+MEDIA_ORPHAN_GRACE_MINUTES = 60
+
+# Короткие ссылки на рецепты: кеш кодов и пакетная запись переходов.
+SHORT_LINK_MAX_LENGTH = 11
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_MISS_TIMEOUT = 60
+SHORT_LINK_FLUSH_SIZE = int(os.getenv('SHORT_LINK_FLUSH_SIZE', 100))
+SHORT_LINK_FLUSH_INTERVAL = int(os.getenv('SHORT_LINK_FLUSH_INTERVAL', 10))
+
+# Снимок справочника ингредиентов: клиент кеширует его и сверяет ETag.
+INGREDIENT_CATALOG_MAX_AGE = 60 * 60
+INGREDIENT_CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+INGREDIENT_CATALOG_DELTA_LIMIT = 1000
+
+# Похожие рецепты: сколько соседей хранить и отдавать.
+RECIPE_NEIGHBORS_TOP_K = 20
+
+# Рекомендации: соседей на рецепт, сколько избранных брать за основу
+# и предел выдачи на один запрос.
+RECOMMENDATION_TOP_N = 50
+RECOMMENDATION_SEED_LIMIT = 20
+RECOMMENDATION_MAX_LIMIT = 50
+
+# Синхронизация рецептов: предел записей в ответе и сколько дней хранить
+# записи об удалениях (и токены, по которым их ещё можно получить).
+RECIPE_CHANGES_LIMIT = 500
+RECIPE_CHANGES_RETENTION_DAYS = 90
+
+# Outbox: размер пачки диспетчера, число попыток и срок хранения событий.
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETENTION_DAYS = 7
+OUTBOX_REPORT_INTERVAL = 60
+
+# Фоновые задачи: число потоков воркера, период пульса выполняющихся
+# задач и сколько секунд без пульса задача считается брошенной упавшим
+# воркером, период отчёта и срок хранения выполненных задач. JOBS_EAGER
+# выполняет задачи сразу в вызывающем коде (локальная отладка).
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', 4))
+JOBS_HEARTBEAT_INTERVAL = 30
+JOBS_LOCK_TIMEOUT = 60 * 5
+JOBS_REPORT_INTERVAL = 60
+JOBS_RETENTION_DAYS = 7
+JOBS_EAGER = bool(os.getenv('JOBS_EAGER'))
+# Периодические задачи: имя -> интервал в секундах.
+JOBS_PERIODIC = {
+    'recipes.tasks.rebuild_recipe_neighbors': 60 * 60 * 24,
+    'recipes.tasks.rebuild_recommendations': 60 * 60,
+    'recipes.tasks.purge_recipe_changes': 60 * 60 * 24,
+    'recipes.tasks.purge_orphaned_media': 60 * 60,
+}
+
+# Админка: выше этого порога changelist показывает оценку числа строк
+# вместо точного COUNT(*).
+ADMIN_EXACT_COUNT_LIMIT = 100000
+
+# Бюджеты запросов вьюх (foodgram.querybudget): off — не проверять,
+# log — предупреждение в лог, raise — ошибка. Запросы дольше порога
+# сохраняются с планом EXPLAIN; нарушения пишутся в NDJSON-файл,
+# сводку строит команда query_budget_report.
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off')
+QUERY_BUDGET_SLOW_MS = int(os.getenv('QUERY_BUDGET_SLOW_MS', 100))
+QUERY_BUDGET_EXPLAIN_LIMIT = 3
+QUERY_BUDGET_REPORT_FILE = os.getenv('QUERY_BUDGET_REPORT_FILE')
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
 ]
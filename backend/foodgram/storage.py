@@ -0,0 +1,131 @@
+import hashlib
+import os
+import posixpath
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+
+# Поля моделей, которые ссылаются на файлы в медиа-хранилище.
+# Файл удаляется только когда на него не ссылается ни одна запись.
+MEDIA_REFERENCES = (
+    ('recipes.Recipe', 'image'),
+    ('users.CustomUser', 'avatar'),
+)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем, равным sha256 их содержимого.
+
+    Одинаковые загрузки попадают в один и тот же файл, а имя меняется
+    вместе с содержимым, поэтому медиа можно отдавать как immutable.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        hashed_name = self.hashed_name(name, content)
+        if self.exists(hashed_name):
+            try:
+                # Свежая отметка времени защищает общий файл от очистки сирот,
+                # пока ссылка на него ещё не зафиксирована.
+                os.utime(self.path(hashed_name))
+                return hashed_name
+            except FileNotFoundError:
+                pass  # Файл только что убрала очистка: записываем заново.
+        return super().save(hashed_name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Файл с тем же именем хранит то же содержимое: суффикс не нужен.
+        return name
+
+    def _save(self, name, content):
+        # Файл мог появиться после проверки exists() в save(): пишем во
+        # временный файл и атомарно переименовываем. Одновременные загрузки
+        # одного содержимого дают один файл, а недописанный файл никто не видит.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'chunks'):
+            for chunk in content.chunks():
+                digest.update(chunk)
+        else:
+            for chunk in iter(lambda: content.read(64 * 1024), b''):
+                digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = posixpath.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, hexdigest[:2], f"{hexdigest}{ext}")
+
+
+def _referenced(names):
+    found = set()
+    for model_label, field_name in MEDIA_REFERENCES:
+        model = apps.get_model(model_label)
+        found.update(
+            model._default_manager.filter(**{f'{field_name}__in': names}).values_list(field_name, flat=True)
+        )
+    return found
+
+
+def _remove_if_stale(path, horizon):
+    """Удаляет файл, если за время проверки его не переиспользовала загрузка.
+
+    Файл сначала переименовывается: save() после этого его не найдёт и
+    запишет заново, а отметку времени, обновлённую до переименования,
+    видно здесь — тогда файл возвращается на место.
+    """
+    quarantined = f'{path}.{uuid.uuid4().hex}.orphan'
+    try:
+        os.rename(path, quarantined)
+    except FileNotFoundError:
+        return False
+    if os.stat(quarantined).st_mtime >= horizon:
+        os.replace(quarantined, path)
+        return False
+    os.remove(quarantined)
+    return True
+
+
+def purge_orphaned_media(storage=None, grace_minutes=None, batch_size=500):
+    """Удаляет файлы, на которые не ссылается ни одна запись. Возвращает их число.
+
+    Файл моложе grace_minutes не трогаем: загрузка могла ещё не
+    зафиксировать ссылку на него. Так же уходят недописанные временные
+    файлы. Рецепты и аватары, удалённые каскадом или через админку,
+    очищаются тем же путём.
+    """
+    storage = storage or default_storage
+    grace_minutes = settings.MEDIA_ORPHAN_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    horizon = time.time() - grace_minutes * 60
+    directories = {
+        apps.get_model(model_label)._meta.get_field(field_name).upload_to
+        for model_label, field_name in MEDIA_REFERENCES
+    }
+    candidates = {}
+    for directory in directories:
+        for root, _, filenames in os.walk(storage.path(directory)):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                try:
+                    if os.stat(path).st_mtime >= horizon:
+                        continue
+                except FileNotFoundError:
+                    continue
+                candidates[os.path.relpath(path, storage.location).replace(os.sep, '/')] = path
+
+    deleted = 0
+    names = list(candidates)
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        referenced = _referenced(batch)
+        for name in batch:
+            if name not in referenced and _remove_if_stale(candidates[name], horizon):
+                deleted += 1
+    return deleted
@@ -0,0 +1,475 @@
+import gzip
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipes import backup, sync
+from recipes.models import Recipe, RecipeChange
+from users.models import CustomUser
+from . import compression, hashers, renderers, storage
+from .compression import CompressionMiddleware
+from .db_routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinningMiddleware
+from .fields import Base64ImageField
+from .paginators import EstimatedCountPaginator, estimate_count
+from .storage import ContentAddressedStorage
+from .throttling import ConcurrencyLimit, ServiceUnavailable, take_token
+
+
+class SlowCache(LocMemCache):
+    """Отдаёт управление другим потокам между чтением и записью."""
+
+    def get(self, *args, **kwargs):
+        value = super().get(*args, **kwargs)
+        time.sleep(0.001)
+        return value
+
+
+def take_concurrently(backend, key, capacity, threads=8, attempts=5):
+    results = []
+    barrier = threading.Barrier(threads)
+
+    def run():
+        barrier.wait()
+        for _ in range(attempts):
+            results.append(take_token(backend, key, capacity, 60)[0])
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(results)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_requests_do_not_exceed_capacity(self):
+        self.assertEqual(take_concurrently(SlowCache('buckets', {}), 'bucket', 10), 10)
+
+    @unittest.skipUnless(os.getenv('TEST_REDIS_URL'), 'нужен TEST_REDIS_URL')
+    def test_concurrent_requests_do_not_exceed_capacity_on_redis(self):
+        backend = RedisCache(os.environ['TEST_REDIS_URL'], {'KEY_PREFIX': 'foodgram-tests'})
+        backend.delete('bucket')
+        self.assertEqual(take_concurrently(backend, 'bucket', 10), 10)
+
+
+@override_settings(EXPENSIVE_REQUEST_BUDGETS={'scope': 2})
+class ConcurrencyLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_budget_is_enforced_and_released(self):
+        with ConcurrencyLimit('scope'), ConcurrencyLimit('scope'):
+            with self.assertRaises(ServiceUnavailable):
+                ConcurrencyLimit('scope').__enter__()
+        with ConcurrencyLimit('scope'), ConcurrencyLimit('scope'):
+            pass
+
+    def test_expired_counter_is_not_driven_negative(self):
+        stale = [ConcurrencyLimit('scope').__enter__() for _ in range(2)]
+        # Счётчик истёк, пока запросы ещё выполнялись.
+        cache.delete(stale[0].counter)
+        first = ConcurrencyLimit('scope').__enter__()
+        for limit in stale:
+            limit.__exit__(None, None, None)
+        second = ConcurrencyLimit('scope').__enter__()
+        with self.assertRaises(ServiceUnavailable):
+            ConcurrencyLimit('scope').__enter__()
+        first.__exit__(None, None, None)
+        second.__exit__(None, None, None)
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(username='buyer', email='buyer@example.org', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+
+    def test_download_is_throttled_after_bucket_is_empty(self):
+        statuses = [self.client.get('/api/recipes/download_shopping_cart/').status_code for _ in range(11)]
+        self.assertEqual(statuses, [200] * 10 + [429])
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertGreater(int(response['Retry-After']), 0)
+
+
+@unittest.skipIf(renderers.orjson is None, 'orjson не установлен')
+class FastJSONRendererTests(SimpleTestCase):
+    def assert_same_as_drf(self, data):
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_output_matches_drf(self):
+        for data in (
+            {'t': 'a\u2028b\u2029c', 'name': 'Борщ', 'control': '\x00\x1f"\\'},
+            {1: 2, None: 3, False: 4, 1.5: 5},
+            {'big': 2 ** 70, 'negative': -2 ** 70},
+            {'when': datetime(2026, 10, 19, 12, 30, 15, 123456, tzinfo=dt_timezone.utc), 'price': Decimal('1.50')},
+            [gettext_lazy('Рецепт'), (1, 2), {'nested': [0.1, -0.0, 123456789.123]}],
+        ):
+            with self.subTest(data=data):
+                self.assert_same_as_drf(data)
+
+    def test_documented_float_difference(self):
+        self.assertEqual(renderers.dumps([1e16]), b'[1e16]')
+        self.assertEqual(JSONRenderer().render([1e16]), b'[1e+16]')
+
+
+class PasswordHashingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='admin', email='admin@example.org', password='Секрет123', is_staff=True
+        )
+
+    def saturated_pool(self):
+        # Ни одного свободного места: _submit ждёт таймаут и сдаётся.
+        return mock.patch.object(hashers, '_get_pool', return_value=(None, threading.Semaphore(0)))
+
+    @override_settings(PASSWORD_HASHING_TIMEOUT=0.01)
+    def test_saturated_pool_gives_503_not_500(self):
+        with self.saturated_pool():
+            with self.assertRaises(hashers.HashingOverloaded):
+                self.user.check_password('Секрет123')
+            for url, data in (
+                ('/admin/login/', {'username': 'admin@example.org', 'password': 'Секрет123'}),
+                ('/api/auth/token/login/', {'email': 'admin@example.org', 'password': 'Секрет123'}),
+            ):
+                with self.subTest(url=url):
+                    response = self.client.post(url, data)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response['Retry-After'], '5')
+
+    def test_hashes_from_previous_defaults_still_verify(self):
+        encoded = make_password('Секрет123', hasher='pbkdf2_sha1')
+        self.assertTrue(check_password('Секрет123', encoded))
+        self.assertFalse(check_password('чужой', encoded))
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            CustomUser.objects.create_user(username=f'user{index}', email=f'user{index}@example.org', password='x')
+
+    def test_filtered_changelist_gets_exact_count(self):
+        filtered = CustomUser.objects.filter(username__startswith='user').order_by('id')
+        with mock.patch.object(connections['default'], 'vendor', 'postgresql'):
+            # Оценка по статистике для запроса с условиями не запрашивается вовсе.
+            with self.assertNumQueries(0):
+                self.assertIsNone(estimate_count(filtered))
+            with override_settings(ADMIN_EXACT_COUNT_LIMIT=0), self.assertNumQueries(1):
+                self.assertEqual(EstimatedCountPaginator(filtered, 2).count, 3)
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.storage.location)
+            for root, _, names in os.walk(self.storage.location) for name in names
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('recipes/images/a.PNG', ContentFile(b'image'))
+        second = self.storage.save('recipes/images/b.png', ContentFile(b'image'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.png'))
+        self.assertEqual(self.stored_files(), [first])
+
+    def test_file_appearing_after_exists_check_is_reused(self):
+        name = self.storage.save('recipes/images/a.png', ContentFile(b'image'))
+        # Гонка: другой процесс записал тот же файл между exists() и записью.
+        with mock.patch.object(self.storage, 'exists', return_value=False):
+            self.assertEqual(self.storage.save('recipes/images/a.png', ContentFile(b'image')), name)
+        self.assertEqual(self.stored_files(), [name])
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'image')
+
+
+
+class OrphanedMediaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+        self.author = CustomUser.objects.create_user(username='owner', email='owner@example.org', password='x')
+
+    def save(self, content, age_minutes=120):
+        name = self.storage.save('recipes/images/x.png', ContentFile(content))
+        moment = time.time() - age_minutes * 60
+        os.utime(self.storage.path(name), (moment, moment))
+        return name
+
+    def purge(self):
+        return storage.purge_orphaned_media(self.storage, grace_minutes=60)
+
+    def add_recipe(self, image, author=None):
+        return Recipe.objects.create(
+            author=author or self.author, name='Рецепт', text='Текст', cooking_time=5, image=image
+        )
+
+    def test_only_old_unreferenced_files_are_removed(self):
+        orphan = self.save(b'orphan')
+        referenced = self.save(b'referenced')
+        self.add_recipe(referenced)
+        fresh = self.save(b'fresh', age_minutes=1)
+        self.assertEqual(self.purge(), 1)
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(referenced))
+        self.assertTrue(self.storage.exists(fresh))
+
+    def test_dedup_hit_renews_grace(self):
+        name = self.save(b'shared')
+        # Новая загрузка того же содержимого ещё не зафиксировала свою запись.
+        self.assertEqual(self.storage.save('recipes/images/y.png', ContentFile(b'shared')), name)
+        self.assertEqual(self.purge(), 0)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_file_touched_during_check_is_restored(self):
+        name = self.save(b'shared')
+        path = self.storage.path(name)
+        os.utime(path)
+        self.assertFalse(storage._remove_if_stale(path, time.time() - 3600))
+        self.assertTrue(self.storage.exists(name))
+
+    def test_cascade_deletes_are_cleaned_up(self):
+        other = CustomUser.objects.create_user(username='leaving', email='leaving@example.org', password='x')
+        name = self.save(b'cascade')
+        self.add_recipe(name, author=other)
+        other.delete()
+        self.assertEqual(self.purge(), 1)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_stale_temporary_files_are_removed(self):
+        name = self.save(b'image')
+        leftover = self.storage.path(name) + '.abc.tmp'
+        with open(leftover, 'wb') as file:
+            file.write(b'partial')
+        os.utime(leftover, (0, 0))
+        self.add_recipe(name)
+        self.assertEqual(self.purge(), 1)
+        self.assertFalse(os.path.exists(leftover))
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, request, status=200):
+        """Пропускает запрос через middleware; возвращает (база чтения, ответ)."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(CustomUser))
+            return HttpResponse(status=status)
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen[0], response
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.route(self.factory.get('/api/recipes/'))[0], 'replica_1')
+        self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.route(self.factory.get('/api/recipes/'))[0], 'default')
+        # Вне запроса (воркеры, outbox, команды) — только primary.
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+
+    def test_successful_write_pins_client_to_primary(self):
+        database, response = self.route(self.factory.post('/api/recipes/'))
+        self.assertEqual(database, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        request = self.factory.get('/api/recipes/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.route(request)[0], 'default')
+
+    def test_token_client_is_pinned_through_cache(self):
+        auth = {'HTTP_AUTHORIZATION': 'Token abc'}
+        self.route(self.factory.post('/api/recipes/', **auth))
+        self.assertEqual(self.route(self.factory.get('/api/recipes/', **auth))[0], 'default')
+        self.assertEqual(self.route(self.factory.get('/api/recipes/', HTTP_AUTHORIZATION='Token xyz'))[0], 'replica_1')
+
+    def test_failed_write_does_not_pin(self):
+        auth = {'HTTP_AUTHORIZATION': 'Token abc'}
+        _, response = self.route(self.factory.post('/api/recipes/', **auth), status=400)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.route(self.factory.get('/api/recipes/', **auth))[0], 'replica_1')
+
+
+# Прозрачный PNG 1×1.
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA'
+    '60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+class ColdStartTests(SimpleTestCase):
+    def run_child(self, code, **env):
+        """Выполняет code в свежем интерпретаторе и возвращает его вывод."""
+        result = subprocess.run(
+            [sys.executable, '-c', code], env={**os.environ, **env}, cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        return result.stdout.strip()
+
+    def test_startup_does_not_load_image_decoder(self):
+        code = "import sys, foodgram.wsgi; print('drf_extra_fields' in sys.modules)"
+        self.assertEqual(self.run_child(code), 'False')
+
+    def test_api_only_skips_admin(self):
+        # django.contrib.admin всё равно импортирует DRF (схемы через admindocs),
+        # поэтому проверяем то, что зависит от нас: админку приложений и её URL.
+        code = (
+            "import sys, foodgram.wsgi; from django.urls import resolve, Resolver404\n"
+            "try:\n    resolve('/admin/'); routed = True\nexcept Resolver404:\n    routed = False\n"
+            "print(routed, any(name in sys.modules for name in ('recipes.admin', 'users.admin')))"
+        )
+        self.assertEqual(self.run_child(code, API_ONLY='1'), 'False False')
+        self.assertEqual(self.run_child(code), 'True True')
+
+    def test_lazy_base64_field_decodes_on_upload(self):
+        image = Base64ImageField().run_validation(PIXEL)
+        self.assertTrue(image.name.endswith('.png'))
+
+    def test_benchmark_command_enforces_budget(self):
+        output = io.StringIO()
+        call_command('benchmark_startup', runs=1, budget=60000, stdout=output)
+        self.assertIn('В пределах бюджета', output.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_startup', runs=1, budget=0, stdout=io.StringIO())
+
+
+@unittest.skipUnless(connections['default'].vendor == 'sqlite', 'снимок базы делается средствами SQLite')
+class LaggingReplicaTests(TransactionTestCase):
+    """Реплика — снимок primary, сделанный до записи тестовых данных."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(os.path.join(directory.name, 'replica.sqlite3'))
+        primary.connection.backup(replica)
+        replica.close()
+        connections['lagging'] = type(primary)(
+            dict(primary.settings_dict, NAME=os.path.join(directory.name, 'replica.sqlite3')), alias='lagging'
+        )
+        self.addCleanup(self.drop_replica)
+        replicas = override_settings(DATABASE_REPLICAS=['lagging'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.author = CustomUser.objects.create_user(username='writer', email='writer@example.org', password='x')
+
+    def drop_replica(self):
+        connections['lagging'].close()
+        del connections['lagging']
+
+    def add_recipe(self):
+        return Recipe.objects.create(
+            author=self.author, name='Свежий', text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+
+    def test_background_code_reads_from_primary(self):
+        recipe = self.add_recipe()
+        sync.record_change(recipe.id)
+        self.assertIs(RecipeChange.objects.get(recipe_id=recipe.id).deleted, False)
+        record = {
+            'id': 1, 'author': {'email': 'new@example.org', 'username': 'newcomer', 'first_name': 'Н', 'last_name': 'Н'},
+            'name': 'Импорт', 'text': 'Текст', 'cooking_time': 5, 'image': 'recipes/images/x.png',
+            'created': '2026-01-01T00:00:00+00:00', 'ingredients': [],
+        }
+        ids = backup.import_records([record])
+        self.assertEqual(Recipe.objects.get(pk=ids[1]).author.username, 'newcomer')
+
+    def test_request_reads_replica_outside_transactions_only(self):
+        recipe = self.add_recipe()
+        seen = {}
+
+        def view(request):
+            seen['plain'] = Recipe.objects.filter(pk=recipe.id).exists()
+            with transaction.atomic():
+                seen['atomic'] = Recipe.objects.filter(pk=recipe.id).exists()
+            return HttpResponse()
+
+        ReplicaPinningMiddleware(view)(RequestFactory().get('/api/recipes/'))
+        self.assertEqual(seen, {'plain': False, 'atomic': True})
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"name": "' + b'a' * 500 + b'"}'
+
+    def respond(self, accept='gzip', body=None, content_type='application/json', **headers):
+        response = HttpResponse(self.body if body is None else body, content_type=content_type, headers=headers)
+        request = RequestFactory().get('/api/recipes/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_large_json(self):
+        with mock.patch.object(compression, 'brotli', None):
+            response = self.respond('br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli не установлен')
+    def test_prefers_brotli(self):
+        response = self.respond('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), self.body)
+
+    def test_small_response_is_left_alone(self):
+        response = self.respond(body=b'{}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_refused_encodings_are_respected(self):
+        for accept in ('gzip;q=0', 'br;q=1, gzip;q=0, *;q=0', ''):
+            with self.subTest(accept=accept), mock.patch.object(compression, 'brotli', None):
+                response = self.respond(accept)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.body)
+                # Ответ зависит от Accept-Encoding, даже если не сжат.
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_only_listed_content_types(self):
+        response = self.respond(body=b'<html>' + b'a' * 500, content_type='text/html; charset=utf-8')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.respond(content_type='application/json; charset=utf-8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_strong_etag_becomes_weak(self):
+        self.assertEqual(self.respond(ETag='"v1"')['ETag'], 'W/"v1"')
+        self.assertEqual(self.respond(ETag='W/"v1"')['ETag'], 'W/"v1"')
@@ -0,0 +1,204 @@
+import functools
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# Пополнение и списание токена одной командой на стороне Redis.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * refill)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, tostring(tokens)}
+"""
+
+_local_lock = threading.Lock()
+
+
+def take_token(backend, key, capacity, duration):
+    """Берёт токен из ведра key. Возвращает (разрешено, остаток токенов).
+
+    На Redis ведро меняется атомарно Lua-скриптом и общее для всех
+    процессов. Остальные бэкенды (LocMem по умолчанию) живут внутри
+    процесса, и атомарность обеспечивает блокировка процесса.
+    """
+    refill = capacity / duration
+    now = time.time()
+    if isinstance(backend, RedisCache):
+        client = backend._cache.get_client(key, write=True)
+        allowed, tokens = client.eval(
+            TOKEN_BUCKET_SCRIPT, 1, backend.make_and_validate_key(key), capacity, refill, now, duration
+        )
+        return bool(allowed), float(tokens)
+    with _local_lock:
+        tokens, stamp = backend.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - stamp) * refill)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        backend.set(key, (tokens, now), duration)
+    return allowed, tokens
+
+
+def parse_rate(rate):
+    """'20/hour' -> (20, 3600), как в SimpleRateThrottle."""
+    if rate is None:
+        return None, None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket в общем кеше.
+
+    Ёмкость и скорость пополнения берутся из
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['<scope>_<kind>'], например
+    'recipe_create_user': '20/hour'. В отличие от окна SimpleRateThrottle,
+    допускает короткие всплески до ёмкости ведра. Общим для всех
+    процессов ведро становится только на Redis (см. take_token).
+    """
+    cache_alias = 'default'
+    scope = None
+    kind = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def get_rate(self):
+        return parse_rate(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].get(f'{self.scope}_{self.kind}'))
+
+    def allow_request(self, request, view):
+        capacity, duration = self.get_rate()
+        ident = self.get_ident_key(request)
+        if capacity is None or ident is None:
+            return True
+
+        allowed, tokens = take_token(caches[self.cache_alias], f'throttle:{self.scope}:{self.kind}:{ident}', capacity, duration)
+        if not allowed:
+            self._wait = (1 - tokens) * duration / capacity
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'user'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+@functools.cache
+def scoped_throttles(scope):
+    """Пара throttle-классов (по пользователю и по IP) для scope."""
+    return tuple(
+        type(f'{scope.title().replace("_", "")}{cls.__name__}', (cls,), {'scope': scope})
+        for cls in (UserTokenBucketThrottle, IPTokenBucketThrottle)
+    )
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'service_unavailable'
+
+    def __init__(self, wait):
+        super().__init__()
+        # exception_handler DRF выставляет Retry-After по атрибуту wait.
+        self.wait = wait
+
+
+class ConcurrencyLimit:
+    """Ограничивает число одновременных дорогих запросов в scope.
+
+    Бюджеты задаются в EXPENSIVE_REQUEST_BUDGETS; счётчик лежит в кеше
+    и на Redis действует на все процессы (на LocMem — на процесс). При
+    превышении бюджета запрос сразу получает 503 с Retry-After. Работает
+    и как контекстный менеджер, и как декоратор.
+
+    Счётчик живёт EXPENSIVE_REQUEST_SLOT_TIMEOUT с последнего захвата —
+    на случай процессов, упавших, не освободив слот. Если он истёк при
+    незавершённых запросах, следующий захват начинает новое поколение
+    счётчика, а старые запросы освобождают слоты в старом и не уводят
+    новый в минус.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.key = f'inflight:{scope}'
+        self.counter = None
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with type(self)(self.scope):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        budget = settings.EXPENSIVE_REQUEST_BUDGETS.get(self.scope)
+        if budget is None:
+            return self
+        timeout = settings.EXPENSIVE_REQUEST_SLOT_TIMEOUT
+        generation = cache.get(self.key)
+        counter = f'{self.key}:{generation}'
+        if generation is None or not cache.has_key(counter):
+            generation = uuid.uuid4().hex
+            counter = f'{self.key}:{generation}'
+            cache.add(counter, 0, timeout)
+            cache.set(self.key, generation, timeout)
+        try:
+            in_flight = cache.incr(counter)
+        except ValueError:
+            cache.set(counter, 1, timeout)
+            in_flight = 1
+        cache.touch(counter, timeout)
+        cache.touch(self.key, timeout)
+        self.counter = counter
+        if in_flight > budget:
+            self._release()
+            raise ServiceUnavailable(wait=settings.EXPENSIVE_REQUEST_RETRY_AFTER)
+        return self
+
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+    def _release(self):
+        counter, self.counter = self.counter, None
+        if counter is None:
+            return
+        try:
+            cache.decr(counter)
+        except ValueError:
+            # Счётчик этого поколения истёк — освобождать уже нечего.
+            pass
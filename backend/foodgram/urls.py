@@ -1,13 +1,15 @@
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from recipes.views import (
     RecipeViewSet,
     download_shopping_cart,
+    short_link_redirect,
     IngredientListView,
+    IngredientChangesView,
     IngredientDetailView
 )
 from users.views import (
@@ -24,7 +26,6 @@ router = DefaultRouter()
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
-                  path('admin/', admin.site.urls),
                   # Пользователи:
                   path('api/users/', CustomUserListCreateView.as_view(), name='users'),
                   path('api/users/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
@@ -38,9 +39,20 @@ urlpatterns = [
                   path('api/recipes/download_shopping_cart/', download_shopping_cart, name='download_shopping_cart'),
                   path('api/', include(router.urls)),
                   path('api/ingredients/', IngredientListView.as_view(), name='ingredients'),
+                  path('api/ingredients/changes/', IngredientChangesView.as_view(), name='ingredient-changes'),
                   path('api/ingredients/<int:pk>/', IngredientDetailView.as_view(), name='ingredient-detail'),
 
+                  # Короткие ссылки:
+                  path('s/<str:code>/', short_link_redirect, name='short-link'),
+
                   # Аутентификация через djoser:
                   path('api/auth/', include('djoser.urls')),
                   path('api/auth/', include('djoser.urls.authtoken')),
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# В режиме API_ONLY админка не установлена: ни её URL, ни admin.py
+# приложений не загружаются.
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from foodgram.paginators import LargeTableAdminMixin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'run_at', 'attempts', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'heartbeat_at', 'last_error', 'created', 'finished_at')
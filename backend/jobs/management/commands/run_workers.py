@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import WorkerPool, purge_finished, queue_stats, requeue_stale, schedule_periodic
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY)
+        parser.add_argument('--interval', type=float, default=1.0, help='Пауза, когда задач нет, с')
+        parser.add_argument('--burst', action='store_true', help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--stats', action='store_true', help='Только показать состояние очереди')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report(queue_stats())
+            return
+
+        requeue_stale()
+        if not options['burst']:
+            schedule_periodic()
+        pool = WorkerPool(options['concurrency'], options['interval'], burst=options['burst'])
+        pool.start()
+        started = last_report = time.monotonic()
+        try:
+            while pool.alive():
+                pool.join(timeout=1.0)
+                now = time.monotonic()
+                if now - last_report < settings.JOBS_REPORT_INTERVAL:
+                    continue
+                last_report = now
+                requeue_stale()
+                schedule_periodic()
+                purge_finished(timedelta(days=settings.JOBS_RETENTION_DAYS))
+                self._report(queue_stats(), pool, now - started)
+        except KeyboardInterrupt:
+            pool.stop()
+            pool.join()
+        self._report(queue_stats(), pool, time.monotonic() - started)
+
+    def _report(self, stats, pool=None, elapsed=None):
+        line = (
+            f"в очереди: {stats['queued']} (готовы: {stats['ready']}), выполняются: {stats['running']}, "
+            f"с ошибкой: {stats['failed']}, отставание: {stats['lag_seconds']:.1f} с"
+        )
+        if pool is not None:
+            rate = pool.done / elapsed if elapsed else 0.0
+            line += f", выполнено: {pool.done}, ошибок: {pool.failed}, скорость: {rate:.1f} задач/с"
+        self.stdout.write(line)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.schedule(None, *args, **kwargs)
+
+    def schedule(self, countdown, *args, **kwargs):
+        """Ставит задачу в очередь; countdown — задержка в секундах или timedelta."""
+        if settings.JOBS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        if countdown is not None and not isinstance(countdown, timedelta):
+            countdown = timedelta(seconds=countdown)
+        return Job.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + (countdown or timedelta())
+        )
+
+    def retry_delay(self, attempts):
+        return timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+
+
+def task(name=None, max_attempts=5, backoff=10):
+    """Регистрирует функцию как фоновую задачу.
+
+    func.delay(...) ставит её в очередь, func.schedule(countdown, ...) —
+    с задержкой. Аргументы должны сериализоваться в JSON. Повторы идут
+    с экспоненциальной паузой backoff * 2^(попытка - 1) секунд.
+    """
+    def decorator(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', max_attempts, backoff)
+        _tasks[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def registered_tasks():
+    return dict(_tasks)
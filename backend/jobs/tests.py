@@ -0,0 +1,120 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import worker
+from .models import Job
+from .registry import task
+
+calls = []
+
+
+@task(name='jobs.tests.record', max_attempts=1)
+def record(value):
+    calls.append(value)
+
+
+class ClaimTests(TestCase):
+    def test_job_is_claimed_once(self):
+        job = record.delay(1)
+        claimed = worker.claim('a')
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, Job.RUNNING, 1))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertIsNone(worker.claim('b'))
+
+    def test_candidate_taken_by_another_worker_is_skipped(self):
+        # На SQLite FOR UPDATE не блокирует: два воркера могут выбрать одного
+        # кандидата. Проигравший не должен получить задачу.
+        first, second = record.delay(1), record.delay(2)
+        Job.objects.filter(pk=first.pk).update(status=Job.RUNNING, locked_by='b')
+        candidates = mock.Mock()
+        # Первый раз «выбран» уже захваченный кандидат, второй — свободный.
+        candidates.filter.side_effect = [Job.objects.filter(pk=first.pk), Job.objects.filter(pk=second.pk)]
+        with mock.patch.object(Job.objects, 'select_for_update', return_value=candidates):
+            claimed = worker.claim('a')
+        self.assertEqual(claimed.id, second.id)
+        self.assertEqual(Job.objects.get(pk=first.pk).locked_by, 'b')
+
+
+class RequeueStaleTests(TestCase):
+    def test_only_jobs_without_heartbeat_are_requeued(self):
+        long_ago = timezone.now() - timedelta(hours=2)
+        alive = record.delay(1)
+        dead = record.delay(2)
+        Job.objects.filter(pk=alive.pk).update(status=Job.RUNNING, locked_at=long_ago, heartbeat_at=timezone.now())
+        Job.objects.filter(pk=dead.pk).update(status=Job.RUNNING, locked_at=long_ago, heartbeat_at=long_ago)
+        self.assertEqual(worker.requeue_stale(60), 1)
+        self.assertEqual(Job.objects.get(pk=alive.pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=dead.pk).status, Job.QUEUED)
+
+    def test_pool_heartbeat_covers_running_jobs(self):
+        job = record.delay(1)
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, heartbeat_at=timezone.now() - timedelta(hours=1))
+        pool = worker.WorkerPool(1)
+        pool._running['w'] = job.id
+        pool.beat()
+        self.assertEqual(worker.requeue_stale(60), 0)
+
+
+class ExecuteTests(TestCase):
+    def test_result_is_not_written_over_another_worker(self):
+        job = record.delay(1)
+        stalled = worker.claim('a')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        worker.requeue_stale(60)
+        worker.claim('b')
+        # Зависший воркер a всё-таки дошёл до конца задачи.
+        self.assertTrue(worker.execute(stalled))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, 'b'))
+
+    def test_own_result_is_written(self):
+        record.delay(1)
+        job = worker.claim('a')
+        self.assertTrue(worker.execute(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.DONE, ''))
+        self.assertIsNotNone(job.finished_at)
+
+# Воркер закрывает соединение в конце работы — нужна настоящая фиксация транзакций.
+@override_settings(JOBS_EAGER=False)
+class WorkerPoolTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_database_error_while_claiming_does_not_stop_worker(self):
+        record.delay(1)
+        real_claim = worker.claim
+        errors = iter([OperationalError('database is locked')])
+
+        def flaky_claim(name):
+            for error in errors:
+                raise error
+            return real_claim(name)
+
+        pool = worker.WorkerPool(1, interval=0, burst=True)
+        with mock.patch.object(worker, 'claim', side_effect=flaky_claim), self.assertLogs('jobs.worker', 'ERROR'):
+            pool._run('w')
+        self.assertEqual(calls, [1])
+        self.assertEqual((pool.done, pool.failed), (1, 0))
+
+    def test_failed_result_write_marks_job_failed_and_continues(self):
+        broken, healthy = record.delay(1), record.delay(2)
+        real_execute = worker.execute
+
+        def execute(job):
+            if job.id == broken.id:
+                raise OperationalError('connection lost')
+            return real_execute(job)
+
+        pool = worker.WorkerPool(1, interval=0, burst=True)
+        with mock.patch.object(worker, 'execute', side_effect=execute), self.assertLogs('jobs.worker', 'ERROR'):
+            pool._run('w')
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, Job.FAILED)
+        self.assertIn('connection lost', broken.last_error)
+        self.assertEqual(Job.objects.get(pk=healthy.pk).status, Job.DONE)
+        self.assertEqual((pool.done, pool.failed), (1, 1))
@@ -0,0 +1,240 @@
+"""Выполнение фоновых задач из таблицы Job.
+
+Очередь живёт в основной БД. Исключительность захвата обеспечивает
+условный UPDATE ... WHERE status = 'queued': задачу получает только тот,
+чей UPDATE изменил строку. На PostgreSQL кандидат выбирается через
+SELECT ... FOR UPDATE SKIP LOCKED, и воркеры не ждут друг друга; SQLite
+(DB_ENGINE=sqlite) FOR UPDATE игнорирует, там воркеры могут выбрать
+одного кандидата, проигравший просто берёт следующего.
+
+Пока задача выполняется, пул раз в JOBS_HEARTBEAT_INTERVAL обновляет
+heartbeat_at. requeue_stale возвращает в очередь только задачи без
+пульса дольше JOBS_LOCK_TIMEOUT, поэтому долгая задача (например,
+полный пересчёт похожих рецептов) не запускается второй раз параллельно.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def claim(locked_by, attempts=3):
+    """Забирает одну готовую к запуску задачу или возвращает None."""
+    for _ in range(attempts):
+        with transaction.atomic():
+            job_id = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.QUEUED, run_at__lte=timezone.now())
+                .order_by('run_at', 'id').values_list('id', flat=True).first()
+            )
+            if job_id is None:
+                return None
+            now = timezone.now()
+            claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=locked_by, locked_at=now, heartbeat_at=now,
+                attempts=F('attempts') + 1
+            )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    # Кандидатов перехватили другие воркеры; попробуем на следующем шаге.
+    return None
+
+
+def _finish(job, **fields):
+    """Записывает итог, только если задача всё ещё за этим воркером.
+
+    requeue_stale мог отдать задачу другому воркеру; тогда её статус
+    уже не наш, и строка не меняется.
+    """
+    finished = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+        locked_by='', **fields
+    )
+    if not finished:
+        logger.warning('Задача %s уже передана другому воркеру, результат не записан', job)
+    return bool(finished)
+
+
+def execute(job):
+    """Выполняет задачу и фиксирует результат. Возвращает True при успехе."""
+    task = get_task(job.name)
+    try:
+        if task is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        task.func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', job)
+        error = traceback.format_exc()
+        if task is not None and job.attempts < job.max_attempts:
+            _finish(job, status=Job.QUEUED, run_at=timezone.now() + task.retry_delay(job.attempts), last_error=error)
+        else:
+            _finish(job, status=Job.FAILED, finished_at=timezone.now(), last_error=error)
+        return False
+    _finish(job, status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def mark_failed(job, error):
+    """Завершает задачу ошибкой, если она всё ещё за этим воркером."""
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+        status=Job.FAILED, finished_at=timezone.now(), locked_by='', last_error=error
+    )
+
+
+def requeue_stale(timeout=None):
+    """Возвращает в очередь задачи, воркер которых перестал подавать пульс."""
+    timeout = timeout or settings.JOBS_LOCK_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, locked_at__lt=cutoff),
+        status=Job.RUNNING
+    ).update(status=Job.QUEUED, locked_by='', run_at=timezone.now())
+
+
+def schedule_periodic():
+    """Ставит периодические задачи из JOBS_PERIODIC, если их нет в очереди."""
+    created = 0
+    for name, interval in settings.JOBS_PERIODIC.items():
+        if Job.objects.filter(name=name, status__in=(Job.QUEUED, Job.RUNNING)).exists():
+            continue
+        get_task(name).schedule(interval)
+        created += 1
+    return created
+
+
+def queue_stats():
+    """Глубина очереди и возраст самой старой готовой к запуску задачи."""
+    now = timezone.now()
+    stats = Job.objects.aggregate(
+        queued=Count('id', filter=Q(status=Job.QUEUED)),
+        ready=Count('id', filter=Q(status=Job.QUEUED, run_at__lte=now)),
+        running=Count('id', filter=Q(status=Job.RUNNING)),
+        failed=Count('id', filter=Q(status=Job.FAILED)),
+        oldest=Min('run_at', filter=Q(status=Job.QUEUED, run_at__lte=now))
+    )
+    oldest = stats.pop('oldest')
+    stats['lag_seconds'] = (now - oldest).total_seconds() if oldest else 0.0
+    return stats
+
+
+def purge_finished(older_than):
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - older_than).delete()[0]
+
+
+class WorkerPool:
+    """Потоки, выбирающие задачи из очереди.
+
+    Каждый поток работает со своим соединением с БД. Ошибка БД вне кода
+    задачи (захват, запись результата) логируется, задача завершается
+    с ошибкой, а поток продолжает работу. Отдельный поток подаёт пульс
+    выполняющихся задач. Счётчики done и failed накапливаются для отчёта
+    о пропускной способности.
+    """
+
+    def __init__(self, concurrency, interval=1.0, burst=False):
+        self.concurrency = concurrency
+        self.interval = interval
+        self.burst = burst
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._running = {}
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run, args=(worker_name(index),), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def alive(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def beat(self):
+        """Обновляет heartbeat_at задач, которые сейчас выполняет пул."""
+        with self._lock:
+            job_ids = list(self._running.values())
+        if job_ids:
+            Job.objects.filter(pk__in=job_ids, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+
+    def _heartbeat(self):
+        try:
+            while not self._stop.wait(settings.JOBS_HEARTBEAT_INTERVAL) and self.alive():
+                try:
+                    self.beat()
+                except Exception:
+                    logger.exception('Не удалось обновить пульс задач')
+                    connection.close()
+        finally:
+            connection.close()
+
+    def _run(self, name):
+        try:
+            while not self._stop.is_set():
+                try:
+                    succeeded = self._step(name)
+                except Exception:
+                    # Например, OperationalError при захвате: соединение
+                    # пересоздаём и пробуем снова после паузы.
+                    logger.exception('Ошибка воркера %s', name)
+                    connection.close()
+                    self._stop.wait(self.interval)
+                    continue
+                if succeeded is None:
+                    if self.burst:
+                        return
+                    self._stop.wait(self.interval)
+                    continue
+                with self._lock:
+                    if succeeded:
+                        self.done += 1
+                    else:
+                        self.failed += 1
+        finally:
+            connection.close()
+
+    def _step(self, name):
+        """Выполняет одну задачу: None — очередь пуста, иначе успех."""
+        close_old_connections()
+        job = claim(name)
+        if job is None:
+            return None
+        with self._lock:
+            self._running[name] = job.id
+        try:
+            return execute(job)
+        except Exception:
+            # Ошибки самой задачи execute обрабатывает сам; сюда попадают
+            # ошибки БД при записи результата.
+            logger.exception('Не удалось записать результат задачи %s', job)
+            error = traceback.format_exc()
+            connection.close()
+            mark_failed(job, error)
+            return False
+        finally:
+            with self._lock:
+                self._running.pop(name, None)
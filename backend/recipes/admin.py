@@ -1,19 +1,57 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from foodgram.paginators import LargeTableAdminMixin
+from . import nutrition, shopping_list
 from .models import Ingredient, Recipe, RecipeIngredient, Favorite, ShoppingCart
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'cooking_time', 'created', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username', 'author__email')
+    autocomplete_fields = ('author',)
+    inlines = (RecipeIngredientInline,)
+
+    def get_queryset(self, request):
+        # Коррелированный подзапрос считается только для строк текущей
+        # страницы, а не для всей таблицы, как GROUP BY.
+        favorites = (
+            Favorite.objects.filter(recipe=OuterRef('pk')).order_by()
+            .values('recipe').annotate(count=Count('id')).values('count')
+        )
+        return super().get_queryset(request).annotate(
+            favorites_total=Coalesce(Subquery(favorites, output_field=IntegerField()), 0)
+        )
 
+    def save_related(self, request, form, formsets, change):
+        # Состав меняется через inline: обновляем итоги и списки покупок.
+        with shopping_list.recipe_changing(form.instance.id):
+            super().save_related(request, form, formsets, change)
+        nutrition.recalculate_totals([form.instance.id])
+
+    @admin.display(description='Кол-во избранных', ordering='favorites_total')
     def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'Кол-во избранных'
+        return obj.favorites_total
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
 
-admin.site.register(RecipeIngredient)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
\ No newline at end of file
+@admin.register(Favorite, ShoppingCart)
+class UserRecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'recipe', 'created')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
@@ -0,0 +1,111 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from events import sequences
+from foodgram.compression import compress, negotiate_encoding, supported_encodings
+from foodgram.renderers import dumps
+from .models import Ingredient, IngredientChange
+
+CACHE_PREFIX = 'ingredients:catalog:v2:'
+FIELDS = ('id', 'name', 'measurement_unit')
+SEQUENCE = 'ingredients'
+
+
+def record_change(ingredient, deleted=False):
+    """Записывает состояние ингредиента в журнал под следующей версией."""
+    # Своя транзакция на случай автокоммита: номер и запись фиксируются вместе.
+    with transaction.atomic():
+        IngredientChange.objects.create(
+            version=sequences.allocate(SEQUENCE),
+            ingredient_id=ingredient.id,
+            name=ingredient.name,
+            measurement_unit=ingredient.measurement_unit,
+            deleted=deleted
+        )
+
+
+def current_version():
+    return sequences.current(SEQUENCE)
+
+
+def build_snapshot(version):
+    body = dumps(list(Ingredient.objects.order_by('id').values(*FIELDS)))
+    tag = f'{version}-{hashlib.sha256(body).hexdigest()[:16]}'
+    bodies = {None: body, **{encoding: compress(body, encoding) for encoding in supported_encodings()}}
+    return {
+        'version': version,
+        # У каждого представления свой ETag: сжатые тела различаются байтами.
+        'etags': {encoding: f'"{tag}-{encoding}"' if encoding else f'"{tag}"' for encoding in bodies},
+        'bodies': bodies,
+    }
+
+
+def get_snapshot():
+    """Снимок каталога для текущей версии; пересобирается только после изменений."""
+    version = current_version()
+    key = f'{CACHE_PREFIX}{version}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(version)
+        cache.set(key, snapshot, settings.INGREDIENT_CATALOG_CACHE_TIMEOUT)
+    return snapshot
+
+
+def _opaque_tag(etag):
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _etag_matches(if_none_match, etag):
+    """Слабое сравнение, как требует RFC 9110 для If-None-Match: W/"x" равен "x"."""
+    if not if_none_match:
+        return False
+    candidates = {_opaque_tag(tag) for tag in if_none_match.split(',')}
+    return '*' in candidates or _opaque_tag(etag) in candidates
+
+
+def snapshot_response(request):
+    snapshot = get_snapshot()
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    headers = {
+        'ETag': snapshot['etags'][encoding],
+        'Cache-Control': f'public, max-age={settings.INGREDIENT_CATALOG_MAX_AGE}, must-revalidate',
+        'X-Catalog-Version': str(snapshot['version']),
+    }
+    if _etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), headers['ETag']):
+        response = HttpResponseNotModified(headers=headers)
+    else:
+        response = HttpResponse(
+            snapshot['bodies'][encoding], content_type='application/json', headers=headers
+        )
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def changes_since(version, limit):
+    """Последние состояния ингредиентов, изменённых после версии version.
+
+    Возвращает (изменения, версия последней учтённой записи, есть ли ещё).
+    """
+    rows = list(
+        IngredientChange.objects.filter(version__gt=version).order_by('version')
+        .values('version', 'ingredient_id', 'name', 'measurement_unit', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    for row in rows:
+        latest[row['ingredient_id']] = {
+            'id': row['ingredient_id'],
+            'name': row['name'],
+            'measurement_unit': row['measurement_unit'],
+            'deleted': row['deleted'],
+        }
+    return list(latest.values()), (rows[-1]['version'] if rows else version), has_more
@@ -0,0 +1,23 @@
+"""Обработчики событий outbox: производные данные рецептов."""
+from events.dispatcher import handler
+from . import similarity, sync
+
+
+@handler('recipe.created', 'recipe.updated', 'recipe.deleted', 'recipe.totals_changed')
+def record_change(event):
+    sync.record_change(event.aggregate_id)
+
+
+@handler('recipe.created', 'recipe.updated')
+def refresh_neighbors(event):
+    if event.payload.get('imported'):
+        # После импорта соседей пересобирает rebuild_recipe_neighbors целиком.
+        return
+    similarity.update_recipe(event.aggregate_id)
+
+
+@handler('recipe.deleted')
+def refill_neighbors(event):
+    # Строки с удалённым рецептом ушли каскадом; освободившиеся места
+    # в чужих списках заполняем полным пересчётом.
+    similarity.recompute(event.payload.get('listed_by', []))
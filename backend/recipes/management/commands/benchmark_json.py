@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from foodgram import renderers
+from foodgram.compression import compress, supported_encodings
+from recipes.models import Recipe
+from recipes.serializers import RecipeListSerializer
+
+
+def synthetic_page(size, ingredients_per_recipe):
+    """Страница в формате RecipeListSerializer без обращения к БД."""
+    return [
+        {
+            'id': i,
+            'author': {
+                'id': i, 'username': f'user{i}', 'email': f'user{i}@example.org',
+                'first_name': 'Имя', 'last_name': 'Фамилия', 'avatar': None,
+                'is_subscribed': False,
+            },
+            'ingredients': [
+                {'id': j, 'name': f'Ингредиент {j}', 'measurement_unit': 'г', 'amount': 100}
+                for j in range(ingredients_per_recipe)
+            ],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': f'Рецепт {i}',
+            'image': f'http://localhost/media/recipes/images/{i:064x}.jpg',
+            'text': 'Описание рецепта. ' * 20,
+            'cooking_time': 30,
+        }
+        for i in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время кодирования и размер страниц RecipeListSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=settings.REST_FRAMEWORK['PAGE_SIZE'])
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Использовать синтетическую страницу вместо рецептов из БД'
+        )
+        parser.add_argument('--ingredients', type=int, default=10, help='Ингредиентов на рецепт (--synthetic)')
+
+    def handle(self, *args, **options):
+        page_size, repeat = options['page_size'], options['repeat']
+        if options['synthetic']:
+            data = synthetic_page(page_size, options['ingredients'])
+        else:
+            recipes = (
+                Recipe.objects.select_related('author')
+                .prefetch_related('recipe_ingredients__ingredient')[:page_size]
+            )
+            data = RecipeListSerializer(recipes, many=True).data
+            if not data:
+                raise CommandError('В базе нет рецептов, используйте --synthetic.')
+
+        encoders = [('json (DRF)', JSONRenderer().render)]
+        if renderers.orjson is not None:
+            encoders.append(('orjson', renderers.dumps))
+
+        self.stdout.write(f'Страница: {len(data)} рецептов, повторов: {repeat}')
+        for label, encode in encoders:
+            elapsed, body = self._measure(lambda: encode(data), repeat)
+            self.stdout.write(f'{label:<12} encode {elapsed * 1000:8.3f} мс  {len(body):>8} байт')
+            for encoding in supported_encodings():
+                elapsed, compressed = self._measure(lambda: compress(body, encoding), repeat)
+                self.stdout.write(
+                    f'{"":<12} {encoding:<6} {elapsed * 1000:8.3f} мс  {len(compressed):>8} байт '
+                    f'({len(compressed) / len(body):.0%})'
+                )
+
+    @staticmethod
+    def _measure(func, repeat):
+        result = func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat, result
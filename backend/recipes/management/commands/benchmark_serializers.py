@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.serializers import IngredientSerializer, RecipeListSerializer
+from users.models import CustomUser
+
+
+def build_ingredients(count):
+    return [Ingredient(id=i, name=f'Ингредиент {i}', measurement_unit='г') for i in range(1, count + 1)]
+
+
+def build_recipes(count, ingredients_per_recipe):
+    """Рецепты в памяти с заполненным prefetch-кешем: замер идёт без БД."""
+    ingredients = build_ingredients(ingredients_per_recipe)
+    recipes = []
+    for i in range(1, count + 1):
+        author = CustomUser(
+            id=i, username=f'user{i}', email=f'user{i}@example.org',
+            first_name='Имя', last_name='Фамилия'
+        )
+        recipe = Recipe(
+            id=i, author=author, name=f'Рецепт {i}', text='Описание рецепта. ' * 20,
+            cooking_time=30, image=f'recipes/images/{i:064x}.jpg'
+        )
+        recipe._prefetched_objects_cache = {
+            'recipe_ingredients': [
+                RecipeIngredient(id=i * 100 + j, recipe=recipe, ingredient=ingredient, amount=100)
+                for j, ingredient in enumerate(ingredients)
+            ]
+        }
+        recipes.append(recipe)
+    return recipes
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стоимость строки в обычной и быстрой сериализации списков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--ingredients', type=int, default=10, help='Ингредиентов на рецепт')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            ingredients = build_ingredients(size)
+            rows = [(obj.id, obj.name, obj.measurement_unit) for obj in ingredients]
+            fields = IngredientSerializer.Meta.fields
+            self._compare(
+                f'Ингредиенты x{size}',
+                lambda: IngredientSerializer(ingredients, many=True).data,
+                # values() отдаёт такие же словари; здесь — без учёта самого запроса.
+                lambda: [dict(zip(fields, row)) for row in rows],
+                size,
+            )
+
+            recipes = build_recipes(size, options['ingredients'])
+            self._compare(
+                f'Рецепты x{size}',
+                lambda: serializers.ListSerializer(recipes, child=RecipeListSerializer()).data,
+                lambda: RecipeListSerializer(recipes, many=True).data,
+                size,
+            )
+
+    def _compare(self, label, regular, fast, size):
+        regular_time, regular_data = self._measure(regular)
+        fast_time, fast_data = self._measure(fast)
+        if list(regular_data) != list(fast_data):
+            raise CommandError(f'{label}: быстрый путь дал другой результат.')
+        self.stdout.write(
+            f'{label:<18} обычный {regular_time / size * 1e6:8.2f} мкс/строка  '
+            f'быстрый {fast_time / size * 1e6:8.2f} мкс/строка  '
+            f'x{regular_time / fast_time:.1f}'
+        )
+
+    @staticmethod
+    def _measure(func):
+        start = time.perf_counter()
+        result = func()
+        return time.perf_counter() - start, result
@@ -0,0 +1,121 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе: холодный импорт приложения и один запрос.
+CHILD = r'''
+import io, json, sys, time
+started = time.perf_counter()
+server, path = sys.argv[1], sys.argv[2]
+if server == 'wsgi':
+    from foodgram.wsgi import application
+else:
+    from foodgram.asgi import application
+imported = time.perf_counter()
+from django.conf import settings
+host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+if server == 'wsgi':
+    result = {}
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'HTTP_ACCEPT': 'application/json', 'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    body = b''.join(application(environ, lambda status, headers: result.update(status=status)))
+    status = int(result['status'].split()[0])
+else:
+    import asyncio
+    messages = []
+    incoming = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop()
+        # Клиент «не отключается», пока Django не отменит ожидание.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'server': (host, 80), 'client': ('127.0.0.1', 0),
+        'headers': [(b'host', host.encode()), (b'accept', b'application/json')],
+    }
+    asyncio.run(application(scope, receive, send))
+    status = messages[0]['status']
+responded = time.perf_counter()
+print(json.dumps({'import': imported - started, 'first_response': responded - imported, 'status': status}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Измеряет холодный старт: импорт WSGI/ASGI-приложения и первый ответ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+        parser.add_argument('--path', default='/api/', help='URL первого запроса')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--api-only', action='store_true', help='Запускать с API_ONLY=1')
+        parser.add_argument('--importtime', action='store_true', help='Показать самые дорогие при импорте пакеты')
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--budget', type=int, default=settings.STARTUP_BUDGET_MS, help='Бюджет, мс')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options['api_only']:
+            env['API_ONLY'] = '1'
+        command = [sys.executable, '-c', CHILD, options['server'], options['path']]
+
+        samples = [self._run(command, env) for _ in range(options['runs'])]
+        status = samples[-1]['status']
+        if status >= 500:
+            raise CommandError(f"Первый запрос к {options['path']} вернул {status}.")
+        total = statistics.median(sample['total'] for sample in samples) * 1000
+        self.stdout.write(
+            f"{options['server']}{' (API_ONLY)' if options['api_only'] else ''}, медиана из {len(samples)}: "
+            f"процесс {total:.0f} мс, импорт приложения "
+            f"{statistics.median(sample['import'] for sample in samples) * 1000:.0f} мс, первый ответ "
+            f"{statistics.median(sample['first_response'] for sample in samples) * 1000:.0f} мс "
+            f"(HTTP {status})"
+        )
+
+        if options['importtime']:
+            self._report_imports([sys.executable, '-X', 'importtime', *command[1:]], env, options['top'])
+
+        if total > options['budget']:
+            raise CommandError(f"Холодный старт {total:.0f} мс превышает бюджет {options['budget']} мс.")
+        self.stdout.write(self.style.SUCCESS(f"В пределах бюджета {options['budget']} мс."))
+
+    def _run(self, command, env):
+        start = time.perf_counter()
+        result = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'Процесс завершился с ошибкой.')
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample['total'] = elapsed
+        return sample
+
+    def _report_imports(self, command, env, top):
+        """Собственное время импорта модулей, сложенное по пакетам верхнего уровня."""
+        result = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        packages = defaultdict(int)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = (part.strip() for part in line[len('import time:'):].split('|'))
+            packages[name.split('.')[0]] += int(self_us)
+        total = sum(packages.values())
+        self.stdout.write(f"Импорт модулей: {total / 1000:.0f} мс, по пакетам:")
+        for name, value in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            self.stdout.write(f"  {name:<24} {value / 1000:7.1f} мс  {value / total:6.1%}")
@@ -0,0 +1,20 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих рецептов по ингредиентам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.RECIPE_NEIGHBORS_TOP_K)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк матрицы на одно произведение')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = build_all(top_k=options['top_k'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Записано {written} пар соседей за {elapsed:.1f} с"))
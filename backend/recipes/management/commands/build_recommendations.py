@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import build_cooccurrence
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает совместную встречаемость рецептов в избранном и корзинах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=settings.RECOMMENDATION_TOP_N)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Строк за одно чтение из БД')
+        parser.add_argument('--max-items-per-user', type=int, default=200)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = build_cooccurrence(
+            top_n=options['top_n'],
+            chunk_size=options['chunk_size'],
+            max_items_per_user=options['max_items_per_user']
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Записано {written} пар рецептов за {elapsed:.1f} с"))
@@ -0,0 +1,31 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.backup import export_records, open_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты с ингредиентами и авторами в NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл (.ndjson или .ndjson.gz), "-" — stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Рецептов за одно чтение из БД')
+
+    def handle(self, *args, **options):
+        # При выводе в stdout отчёт уходит в stderr, чтобы не портить данные.
+        report = self.stderr if options['output'] == '-' else self.stdout
+        start = time.perf_counter()
+        count = 0
+        stream = open_ndjson(options['output'], 'w')
+        try:
+            for record in export_records(options['chunk_size']):
+                stream.write(json.dumps(record, ensure_ascii=False))
+                stream.write('\n')
+                count += 1
+        finally:
+            if options['output'] != '-':
+                stream.close()
+        elapsed = time.perf_counter() - start
+        report.write(f"Выгружено рецептов: {count} за {elapsed:.1f} с ({count / elapsed if elapsed else 0:.0f} строк/с)")
@@ -0,0 +1,80 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.backup import import_records, open_ndjson
+from recipes.models import ImportCheckpoint
+from recipes.tasks import rebuild_recipe_neighbors, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Загружает рецепты из NDJSON, выгруженного export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл .ndjson или .ndjson.gz, "-" — stdin')
+        parser.add_argument('--batch-size', type=int, default=500, help='Рецептов в одной транзакции')
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя контрольной точки в БД (по умолчанию полный путь к файлу; для stdin точки нет без этого ключа)'
+        )
+        parser.add_argument('--restart', action='store_true', help='Начать сначала, игнорируя контрольную точку')
+        parser.add_argument(
+            '--id-map',
+            help='Дописывать сюда соответствие старых id рецептов новым (при повторе пачки верна последняя строка)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден.")
+        checkpoint = options['checkpoint'] or (os.path.abspath(path) if path != '-' else None)
+        done = 0 if options['restart'] or checkpoint is None else self._load_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f"Продолжаем с рецепта {done + 1}")
+
+        imported, start = 0, time.perf_counter()
+        id_map = open(options['id_map'], 'a', encoding='utf-8') if options['id_map'] else None
+        try:
+            with open_ndjson(path, 'r') as stream:
+                lines = islice((line for line in stream if line.strip()), done, None)
+                while batch := [json.loads(line) for line in islice(lines, options['batch_size'])]:
+                    # Контрольная точка фиксируется вместе с пачкой: после
+                    # обрыва пачка либо загружена и учтена, либо нет вовсе.
+                    with transaction.atomic():
+                        mapping = import_records(batch)
+                        done += len(batch)
+                        if checkpoint is not None:
+                            self._save_checkpoint(checkpoint, done)
+                        if id_map:
+                            id_map.writelines(f'{old}\t{new}\n' for old, new in mapping.items())
+                            id_map.flush()
+                    imported += len(batch)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f"Загружено рецептов: {done} ({imported / elapsed:.0f} строк/с)")
+        finally:
+            if id_map:
+                id_map.close()
+
+        if checkpoint is not None:
+            ImportCheckpoint.objects.filter(name=checkpoint).delete()
+        if imported:
+            # Соседей и рекомендации после импорта дешевле пересобрать целиком.
+            rebuild_recipe_neighbors.delay()
+            rebuild_recommendations.delay()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершён: {imported} рецептов за {elapsed:.1f} с "
+            f"({imported / elapsed if elapsed else 0:.0f} строк/с)"
+        ))
+
+    @staticmethod
+    def _load_checkpoint(checkpoint):
+        return ImportCheckpoint.objects.filter(name=checkpoint).values_list('done', flat=True).first() or 0
+
+    @staticmethod
+    def _save_checkpoint(checkpoint, done):
+        ImportCheckpoint.objects.update_or_create(name=checkpoint, defaults={'done': done})
@@ -1,6 +1,10 @@
 import csv
 import os
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.catalog import get_snapshot
 from recipes.models import Ingredient
 from django.conf import settings
 
@@ -22,7 +26,7 @@ class Command(BaseCommand):
             raise CommandError(f"Файл {file_path} не найден.")
 
         count = 0
-        with open(file_path, encoding='utf-8') as csvfile:
+        with open(file_path, encoding='utf-8') as csvfile, transaction.atomic():
             reader = csv.DictReader(csvfile, fieldnames=["name", "measurement_unit"])
             for row in reader:
                 name = row.get('name', '').strip()
@@ -34,4 +38,8 @@ class Command(BaseCommand):
                     )
                     if created:
                         count += 1
+        # Снимок в общем кеше собираем сразу, чтобы первый запрос не ждал.
+        # LocMem у каждого процесса свой: прогрев в команде серверу не поможет.
+        if not isinstance(caches['default'], LocMemCache):
+            get_snapshot()
         self.stdout.write(self.style.SUCCESS(f"Успешно загружено {count} ингредиентов из файла {file_path}"))
\ No newline at end of file
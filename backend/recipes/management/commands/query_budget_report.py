@@ -0,0 +1,54 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.querybudget import summarize
+from recipes.backup import open_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Сводка по вьюхам, превысившим бюджет запросов, и по медленным запросам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='NDJSON-отчёты (.gz, "-" — stdin); по умолчанию QUERY_BUDGET_REPORT_FILE'
+        )
+        parser.add_argument('--top', type=int, default=10, help='Сколько медленных запросов показать')
+        parser.add_argument('--explain', action='store_true', help='Показать планы медленных запросов')
+
+    def handle(self, *args, **options):
+        files = options['files'] or ([settings.QUERY_BUDGET_REPORT_FILE] if settings.QUERY_BUDGET_REPORT_FILE else [])
+        if not files:
+            raise CommandError('Укажите файлы отчёта или QUERY_BUDGET_REPORT_FILE.')
+        views, queries = summarize(self._records(files))
+
+        self.stdout.write('Вьюхи:')
+        for view in views:
+            self.stdout.write(
+                f"  {view['label']:<48} отчётов {view['reports']:>6}  превышений {view['exceeded']:>6}  "
+                f"макс. запросов {view['max_queries']:>4}  макс. {view['max_duration_ms']:.0f} мс"
+            )
+        self.stdout.write('Медленные запросы:')
+        for query in queries[:options['top']]:
+            self.stdout.write(
+                f"  {query['count']:>6} раз  всего {query['total_ms']:.0f} мс  макс. {query['max_ms']:.0f} мс  "
+                f"[{', '.join(sorted(query['labels']))}]"
+            )
+            self.stdout.write(f"    {query['sql']}")
+            if options['explain'] and query['explain']:
+                for line in query['explain'].splitlines():
+                    self.stdout.write(f"      {line}")
+
+    @staticmethod
+    def _records(files):
+        for path in files:
+            stream = open_ndjson(path, 'r')
+            try:
+                for line in stream:
+                    if line.strip():
+                        yield json.loads(line)
+            finally:
+                if path != '-':
+                    stream.close()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводные списки покупок из корзин'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Только списки этих пользователей')
+
+    def handle(self, *args, **options):
+        created = rebuild(options['user'])
+        self.stdout.write(self.style.SUCCESS(f"Позиций в списках покупок: {created}"))
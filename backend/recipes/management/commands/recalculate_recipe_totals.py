@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.nutrition import recalculate_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает калорийность и стоимость рецептов (например, после правки цен ингредиентов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredient', type=int, action='append', help='Только рецепты с этим ингредиентом')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.order_by('id')
+        if options['ingredient']:
+            queryset = queryset.filter(recipe_ingredients__ingredient_id__in=options['ingredient']).distinct()
+        recipe_ids = list(queryset.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(recipe_ids), batch_size):
+            recalculate_totals(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано рецептов: {len(recipe_ids)}"))
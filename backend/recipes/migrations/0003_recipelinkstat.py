@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeLinkStat',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='link_stat', serialize=False, to='recipes.recipe')),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Статистика короткой ссылки',
+                'verbose_name_plural': 'Статистика коротких ссылок',
+            },
+        ),
+    ]
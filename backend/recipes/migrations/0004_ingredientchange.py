@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_sequence'),
+        ('recipes', '0003_recipelinkstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(unique=True)),
+                ('ingredient_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=128)),
+                ('measurement_unit', models.CharField(max_length=64)),
+                ('deleted', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение ингредиента',
+                'verbose_name_plural': 'Изменения ингредиентов',
+                'ordering': ['version'],
+            },
+        ),
+    ]
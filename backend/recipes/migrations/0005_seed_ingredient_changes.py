@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:14
+
+from django.db import migrations
+
+
+def seed_changes(apps, schema_editor):
+    # Уже существующие ингредиенты попадают в журнал, чтобы дельта
+    # от версии 0 совпадала с полным каталогом.
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientChange = apps.get_model('recipes', 'IngredientChange')
+    Sequence = apps.get_model('events', 'Sequence')
+    rows = Ingredient.objects.order_by('id').values_list('id', 'name', 'measurement_unit').iterator()
+    changes = [
+        IngredientChange(version=version, ingredient_id=ingredient_id, name=name, measurement_unit=measurement_unit)
+        for version, (ingredient_id, name, measurement_unit) in enumerate(rows, start=1)
+    ]
+    IngredientChange.objects.bulk_create(changes, batch_size=1000)
+    Sequence.objects.update_or_create(name='ingredients', defaults={'value': len(changes)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredientchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipeneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cooccurrences', to='recipes.recipe')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name': 'Совместный интерес',
+                'verbose_name_plural': 'Совместные интересы',
+                'indexes': [models.Index(fields=['recipe', '-score'], name='recipe_cooccurrence_score_idx')],
+                'unique_together': {('recipe', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipecooccurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='base_unit',
+            field=models.CharField(blank=True, help_text='Единица, к которой приводятся количества (г, мл, шт.)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='calories',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='ккал на одну базовую единицу', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Цена одной базовой единицы', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit_factor',
+            field=models.DecimalField(decimal_places=4, default=1, help_text='Сколько базовых единиц в одной единице измерения', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='total_calories',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='total_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:19
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import F
+
+# Копия recipes.nutrition.UNIT_NORMALIZATION на момент миграции: миграции
+# не импортируют код приложения, иначе их результат менялся бы вместе с
+# ним. Правки таблицы в nutrition.py действуют только на новые и
+# пересохранённые ингредиенты; чтобы пересчитать существующие, нужна
+# новая миграция со своей копией таблицы.
+UNIT_NORMALIZATION = {
+    'г': ('г', Decimal('1')),
+    'кг': ('г', Decimal('1000')),
+    'мг': ('г', Decimal('0.001')),
+    'мл': ('мл', Decimal('1')),
+    'л': ('мл', Decimal('1000')),
+    'ч. л.': ('мл', Decimal('5')),
+    'ст. л.': ('мл', Decimal('15')),
+    'стакан': ('мл', Decimal('250')),
+    'капля': ('мл', Decimal('0.05')),
+}
+
+
+def normalize_units(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    for unit, (base_unit, factor) in UNIT_NORMALIZATION.items():
+        Ingredient.objects.filter(measurement_unit=unit).update(base_unit=base_unit, unit_factor=factor)
+    Ingredient.objects.filter(base_unit='').update(base_unit=F('measurement_unit'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_ingredient_nutrition'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+def seed_changes(apps, schema_editor):
+    # Лента начинается с текущего состояния: по записи на каждый рецепт
+    # в порядке создания.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    Sequence = apps.get_model('events', 'Sequence')
+    ids = Recipe.objects.order_by('created', 'id').values_list('id', flat=True).iterator()
+    changes = [RecipeChange(version=version, recipe_id=pk) for version, pk in enumerate(ids, start=1)]
+    RecipeChange.objects.bulk_create(changes, batch_size=1000)
+    Sequence.objects.update_or_create(name='recipes', defaults={'value': len(changes)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_sequence'),
+        ('recipes', '0009_normalize_ingredient_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(unique=True)),
+                ('recipe_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Изменения рецептов',
+                'ordering': ['version'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['recipe_id', 'version'], name='recipe_change_recipe_idx'),
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
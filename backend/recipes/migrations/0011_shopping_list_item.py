@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    amount = models.ExpressionWrapper(
+        models.F('amount') * models.F('ingredient__unit_factor'),
+        output_field=models.DecimalField(max_digits=20, decimal_places=4)
+    )
+    rows = (
+        RecipeIngredient.objects.filter(recipe__shopping_cart__isnull=False)
+        .values_list('recipe__shopping_cart__user_id', 'ingredient__name', 'ingredient__base_unit')
+        .annotate(total=models.Sum(amount))
+        .order_by()
+    )
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, name=name, unit=unit, amount=total) for user_id, name, unit, total in rows),
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipechange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128)),
+                ('unit', models.CharField(max_length=64)),
+                ('amount', models.DecimalField(decimal_places=4, max_digits=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Сводный список покупок',
+                'ordering': ['name', 'unit'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'name', 'unit'), name='unique_shopping_list_item')],
+            },
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,31 @@ from django.conf import settings
 class Ingredient(models.Model):
     name = models.CharField(max_length=128)
     measurement_unit = models.CharField(max_length=64)
+    base_unit = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text='Единица, к которой приводятся количества (г, мл, шт.)'
+    )
+    unit_factor = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        default=1,
+        help_text='Сколько базовых единиц в одной единице измерения'
+    )
+    calories = models.DecimalField(
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        help_text='ккал на одну базовую единицу'
+    )
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        help_text='Цена одной базовой единицы'
+    )
 
     class Meta:
         unique_together = ('name', 'measurement_unit')
@@ -13,6 +38,37 @@ class Ingredient(models.Model):
     def __str__(self):
         return f"{self.name} ({self.measurement_unit})"
 
+    def save(self, *args, **kwargs):
+        if not self.base_unit:
+            from .nutrition import normalize_unit
+            self.base_unit, factor = normalize_unit(self.measurement_unit)
+            # Множитель, заданный вручную (не значение по умолчанию), не трогаем.
+            if self.unit_factor in (None, 1):
+                self.unit_factor = factor
+        super().save(*args, **kwargs)
+
+class IngredientChange(models.Model):
+    """Журнал изменений справочника ингредиентов.
+
+    version — номер из последовательности catalog.SEQUENCE, выданный в
+    транзакции изменения; он растёт в порядке фиксации и служит версией
+    каталога: клиенты запрашивают изменения после известной им версии.
+    """
+    version = models.PositiveBigIntegerField(unique=True)
+    ingredient_id = models.BigIntegerField()
+    name = models.CharField(max_length=128)
+    measurement_unit = models.CharField(max_length=64)
+    deleted = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['version']
+        verbose_name = 'Изменение ингредиента'
+        verbose_name_plural = 'Изменения ингредиентов'
+
+    def __str__(self):
+        return f"v{self.version}: {self.name} ({self.measurement_unit})"
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -24,6 +80,8 @@ class Recipe(models.Model):
     text = models.TextField()
     cooking_time = models.PositiveIntegerField()
     created = models.DateTimeField(auto_now_add=True)
+    total_calories = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
     class Meta:
         ordering = ['-created']
@@ -33,6 +91,104 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
+class RecipeChange(models.Model):
+    """Запись ленты изменений рецептов для инкрементальной синхронизации.
+
+    Пишется обработчиком outbox; version — номер из последовательности
+    sync.SEQUENCE, поэтому записи видны клиентам в порядке фиксации.
+    """
+    version = models.PositiveBigIntegerField(unique=True)
+    recipe_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['version']
+        indexes = [models.Index(fields=['recipe_id', 'version'], name='recipe_change_recipe_idx')]
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+
+    def __str__(self):
+        return f"v{self.version}: рецепт {self.recipe_id}{' удалён' if self.deleted else ''}"
+
+class ImportCheckpoint(models.Model):
+    """Сколько рецептов файла уже загрузил import_recipes.
+
+    Обновляется в транзакции пачки, поэтому не расходится с данными.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    done = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return f"{self.name}: {self.done}"
+
+class RecipeLinkStat(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='link_stat'
+    )
+    hits = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика короткой ссылки'
+        verbose_name_plural = 'Статистика коротких ссылок'
+
+    def __str__(self):
+        return f"Рецепт {self.recipe_id}: {self.hits} переходов"
+
+class RecipeNeighbor(models.Model):
+    """Предрассчитанные похожие рецепты (коэффициент Жаккара по ингредиентам)."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors'
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('recipe', 'neighbor')
+        indexes = [models.Index(fields=['recipe', '-score'], name='recipe_neighbor_score_idx')]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.neighbor_id}: {self.score:.2f}"
+
+class RecipeCooccurrence(models.Model):
+    """Рецепты, которые часто оказываются вместе в избранном и корзинах."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='cooccurrences'
+    )
+    related = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('recipe', 'related')
+        indexes = [models.Index(fields=['recipe', '-score'], name='recipe_cooccurrence_score_idx')]
+        verbose_name = 'Совместный интерес'
+        verbose_name_plural = 'Совместные интересы'
+
+    def __str__(self):
+        return f"{self.recipe_id} + {self.related_id}: {self.score:.2f}"
+
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
@@ -94,4 +250,31 @@ class ShoppingCart(models.Model):
         verbose_name_plural = 'Список покупок'
 
     def __str__(self):
-        return f"{self.user.username} добавил {self.recipe.name} в список покупок"
\ No newline at end of file
+        return f"{self.user.username} добавил {self.recipe.name} в список покупок"
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всей корзине пользователя в базовых единицах.
+
+    Поддерживается инкрементально (recipes.shopping_list): при добавлении
+    рецепта в корзину, удалении из неё и смене состава рецепта.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='shopping_list'
+    )
+    name = models.CharField(max_length=128)
+    unit = models.CharField(max_length=64)
+    amount = models.DecimalField(max_digits=20, decimal_places=4)
+
+    class Meta:
+        ordering = ['name', 'unit']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name', 'unit'], name='unique_shopping_list_item'),
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Сводный список покупок'
+
+    def __str__(self):
+        return f"{self.name} ({self.unit}) — {self.amount}"
+
@@ -0,0 +1,110 @@
+"""Нормализация единиц измерения и оценки калорийности/стоимости.
+
+Каждый ингредиент приводится к базовой единице (г, мл, шт. и т. п.)
+через множитель unit_factor; калорийность и цена ингредиента хранятся
+в расчёте на одну базовую единицу. Итоги рецепта предрассчитываются
+в Recipe.total_calories/total_cost и пересчитываются при смене состава.
+Если хотя бы у одного ингредиента нет данных, итог — null: частичная
+сумма выдавала бы себя за полную.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from events.outbox import emit_many
+from .models import Recipe, RecipeIngredient
+
+# Единица измерения -> (базовая единица, сколько базовых единиц в одной).
+UNIT_NORMALIZATION = {
+    'г': ('г', Decimal('1')),
+    'кг': ('г', Decimal('1000')),
+    'мг': ('г', Decimal('0.001')),
+    'мл': ('мл', Decimal('1')),
+    'л': ('мл', Decimal('1000')),
+    'ч. л.': ('мл', Decimal('5')),
+    'ст. л.': ('мл', Decimal('15')),
+    'стакан': ('мл', Decimal('250')),
+    'капля': ('мл', Decimal('0.05')),
+}
+
+AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=4)
+
+
+def normalize_unit(unit):
+    """(базовая единица, множитель) для единицы измерения."""
+    return UNIT_NORMALIZATION.get(unit.strip(), (unit, Decimal('1')))
+
+
+def normalized_amount(prefix=''):
+    """Количество ингредиента в базовых единицах (выражение для SQL)."""
+    return ExpressionWrapper(
+        F(f'{prefix}amount') * F(f'{prefix}ingredient__unit_factor'), output_field=AMOUNT_FIELD
+    )
+
+
+def _total(metric):
+    return Sum(
+        ExpressionWrapper(
+            F('amount') * F('ingredient__unit_factor') * F(f'ingredient__{metric}'),
+            output_field=AMOUNT_FIELD
+        )
+    )
+
+
+def _missing(metric):
+    return Count('id', filter=Q(**{f'ingredient__{metric}__isnull': True}))
+
+
+def recalculate_totals(recipe_ids):
+    """Пересчитывает предрассчитанные итоги рецептов.
+
+    Три запроса на любую пачку: агрегат по составу, текущие итоги и один
+    bulk_update для рецептов, у которых итоги изменились.
+    """
+    rows = (
+        RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+        .values('recipe_id')
+        .annotate(
+            calories=_total('calories'), cost=_total('price'),
+            missing_calories=_missing('calories'), missing_cost=_missing('price')
+        )
+    )
+    totals = {
+        row['recipe_id']: (
+            None if row['missing_calories'] else _round(row['calories']),
+            None if row['missing_cost'] else _round(row['cost']),
+        )
+        for row in rows
+    }
+    changed = []
+    for recipe in Recipe.objects.filter(pk__in=recipe_ids).only('id', 'author', 'total_calories', 'total_cost'):
+        calories, cost = totals.get(recipe.id, (None, None))
+        if (recipe.total_calories, recipe.total_cost) != (calories, cost):
+            recipe.total_calories, recipe.total_cost = calories, cost
+            changed.append(recipe)
+    Recipe.objects.bulk_update(changed, ['total_calories', 'total_cost'], batch_size=1000)
+    # bulk_update не вызывает сигналы: итоги видны в ленте синхронизации,
+    # поэтому событие пишем сами.
+    emit_many('recipe.totals_changed', ((recipe.id, {'author_id': recipe.author_id}) for recipe in changed))
+
+
+def _round(value):
+    return None if value is None else Decimal(value).quantize(Decimal('0.01'))
+
+
+def shopping_list_totals(user):
+    """Калорийность и стоимость корзины; null, если итог хотя бы одного рецепта неизвестен."""
+    totals = Recipe.objects.filter(shopping_cart__user=user).aggregate(
+        calories=Sum('total_calories'), cost=Sum('total_cost'),
+        missing_calories=Count('id', filter=Q(total_calories__isnull=True)),
+        missing_cost=Count('id', filter=Q(total_cost__isnull=True)),
+    )
+    return {
+        'calories': None if totals['missing_calories'] else totals['calories'],
+        'cost': None if totals['missing_cost'] else totals['cost'],
+    }
+
+
+def format_amount(value):
+    value = Decimal(value).normalize()
+    return f'{value:f}'
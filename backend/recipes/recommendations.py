@@ -0,0 +1,106 @@
+"""Рекомендации «с этим рецептом также выбирают».
+
+build_cooccurrence офлайн проходит по избранному и корзинам потоком,
+отсортированным по пользователю, и копит матрицу совместной
+встречаемости рецептов; в таблицу попадают top-N соседей каждого рецепта.
+recommend собирает выдачу пользователя из соседей его последних
+избранных рецептов за ограниченное число запросов.
+"""
+import heapq
+import math
+from collections import defaultdict
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Favorite, Recipe, RecipeCooccurrence, ShoppingCart
+
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 0.5
+
+
+def _interactions(model, weight, chunk_size):
+    rows = (
+        model.objects.order_by('user_id', '-created')
+        .values_list('user_id', 'recipe_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for user_id, recipe_id in rows:
+        yield user_id, recipe_id, weight
+
+
+def build_cooccurrence(top_n=None, chunk_size=5000, max_items_per_user=200, write_batch=5000):
+    """Пересчитывает RecipeCooccurrence. Возвращает число записей."""
+    top_n = top_n or settings.RECOMMENDATION_TOP_N
+    streams = heapq.merge(
+        _interactions(Favorite, FAVORITE_WEIGHT, chunk_size),
+        _interactions(ShoppingCart, CART_WEIGHT, chunk_size),
+        key=lambda row: row[0]
+    )
+
+    popularity = defaultdict(float)
+    pairs = defaultdict(lambda: defaultdict(float))
+    for _, rows in groupby(streams, key=lambda row: row[0]):
+        weights = {}
+        # Ограничиваем вклад одного пользователя: пары растут квадратично.
+        for _, recipe_id, weight in islice(rows, max_items_per_user):
+            weights[recipe_id] = max(weight, weights.get(recipe_id, 0))
+        items = list(weights.items())
+        for index, (recipe_id, weight) in enumerate(items):
+            popularity[recipe_id] += weight
+            for other_id, other_weight in items[index + 1:]:
+                pairs[recipe_id][other_id] += weight * other_weight
+                pairs[other_id][recipe_id] += weight * other_weight
+
+    written = 0
+    with transaction.atomic():
+        RecipeCooccurrence.objects.all().delete()
+        buffer = []
+        for recipe_id, related in pairs.items():
+            scored = (
+                (other_id, value / math.sqrt(popularity[recipe_id] * popularity[other_id]))
+                for other_id, value in related.items()
+            )
+            for other_id, score in heapq.nlargest(top_n, scored, key=lambda item: item[1]):
+                buffer.append(RecipeCooccurrence(recipe_id=recipe_id, related_id=other_id, score=score))
+            if len(buffer) >= write_batch:
+                RecipeCooccurrence.objects.bulk_create(buffer)
+                written += len(buffer)
+                buffer = []
+        RecipeCooccurrence.objects.bulk_create(buffer)
+        written += len(buffer)
+    return written
+
+
+def recommend(user, limit):
+    """Рецепты для пользователя, от лучших к худшим.
+
+    Число запросов фиксировано и не зависит от истории: последние
+    избранные, их соседи, допустимые кандидаты и сами рецепты. Если
+    кандидатов не хватает, выдача добирается свежими рецептами.
+    """
+    seeds = list(
+        Favorite.objects.filter(user=user).order_by('-created')
+        .values_list('recipe_id', flat=True)[:settings.RECOMMENDATION_SEED_LIMIT]
+    )
+    scores = defaultdict(float)
+    rows = RecipeCooccurrence.objects.filter(recipe_id__in=seeds).values_list('related_id', 'score')
+    for related_id, score in rows:
+        scores[related_id] += score
+    # Избранные рецепты встречаются друг с другом в строке самого
+    # пользователя — убираем их до ранжирования, а не после.
+    for seed in seeds:
+        scores.pop(seed, None)
+
+    queryset = Recipe.objects.exclude(author=user).exclude(favorites__user=user)
+    ranked = []
+    if scores:
+        allowed = queryset.filter(id__in=list(scores)).values_list('id', flat=True)
+        ranked = heapq.nlargest(limit, allowed, key=scores.get)
+
+    queryset = queryset.select_related('author').prefetch_related('recipe_ingredients__ingredient')
+    recipes = sorted(queryset.filter(id__in=ranked), key=lambda recipe: scores[recipe.id], reverse=True)
+    if len(recipes) < limit:
+        recipes.extend(queryset.exclude(id__in=ranked)[:limit - len(recipes)])
+    return recipes
@@ -1,8 +1,12 @@
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
 
+from foodgram.fields import Base64ImageField
+from foodgram.serializers import FastListSerializer, FastPathMixin, SparseFieldsetMixin
+from users.models import CustomUser, Subscription
 from users.serializers import CustomUserSerializer
 from .models import Ingredient, Recipe, RecipeIngredient, Favorite, ShoppingCart
+from . import nutrition, shopping_list
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -26,7 +30,61 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+def get_recipes_limit(request):
+    """?recipes_limit= как неотрицательное число или None, если не задан."""
+    value = request.query_params.get('recipes_limit') if request else None
+    try:
+        return max(int(value), 0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class UserWithRecipesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    recipes = serializers.SerializerMethodField()
+    recipes_count = serializers.SerializerMethodField()
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomUser
+        fields = (
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'avatar', 'is_subscribed', 'recipes', 'recipes_count'
+        )
+        collapsed_fields = {
+            'recipes': lambda: serializers.SerializerMethodField(method_name='get_recipe_ids'),
+        }
+
+    def _limited_recipes(self, obj):
+        # Для списка подписок рецепты уже загружены одним запросом с тем же
+        # пределом (см. users.views.SubscriptionListView), срез берём из кеша.
+        queryset = obj.recipes.all()
+        limit = get_recipes_limit(self.context.get('request'))
+        return queryset if limit is None else queryset[:limit]
+
+    def get_recipe_ids(self, obj):
+        return [recipe.id for recipe in self._limited_recipes(obj)]
+
+    def get_recipes(self, obj):
+        queryset = self._limited_recipes(obj)
+        serializer = RecipeMinifiedSerializer(queryset, many=True, context=self.context)
+        return serializer.data
+
+    def get_recipes_count(self, obj):
+        # Значение из аннотации queryset, если она есть.
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
+
+    def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return Subscription.objects.filter(subscriber=request.user, author=obj).exists()
+        return False
+
+
+class RecipeListSerializer(FastPathMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientInRecipeSerializer(source='recipe_ingredients', many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
@@ -37,8 +95,15 @@ class RecipeListSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'author', 'ingredients', 'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'text', 'cooking_time', 'total_calories', 'total_cost'
         )
+        collapsed_fields = {
+            'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+            'ingredients': lambda: serializers.SlugRelatedField(
+                source='recipe_ingredients', slug_field='ingredient_id', many=True, read_only=True
+            ),
+        }
+        list_serializer_class = FastListSerializer
 
     def get_image(self, obj):
         if obj.image:
@@ -58,6 +123,52 @@ class RecipeListSerializer(serializers.ModelSerializer):
             return ShoppingCart.objects.filter(user=request.user, recipe=obj).exists()
         return False
 
+    def prepare_rows(self, rows):
+        request = self.context.get('request')
+        fields = self.fields
+        state = {'request': request, 'favorited': set(), 'in_cart': set()}
+        if request and request.user.is_authenticated:
+            recipe_ids = {recipe.id for recipe in rows}
+            if 'is_favorited' in fields:
+                state['favorited'] = set(
+                    Favorite.objects.filter(user=request.user, recipe_id__in=recipe_ids)
+                    .values_list('recipe_id', flat=True)
+                )
+            if 'is_in_shopping_cart' in fields:
+                state['in_cart'] = set(
+                    ShoppingCart.objects.filter(user=request.user, recipe_id__in=recipe_ids)
+                    .values_list('recipe_id', flat=True)
+                )
+        if 'author' in fields and 'author' not in self.collapsed_names:
+            author_serializer = fields['author']
+            state['author_accessors'] = author_serializer.compile_accessors()
+            state['author_state'] = author_serializer.prepare_rows([recipe.author for recipe in rows])
+        return state
+
+    def fast_author(self, obj, state):
+        author, author_state = obj.author, state['author_state']
+        return {name: get(author, author_state) for name, get in state['author_accessors']}
+
+    def fast_ingredients(self, obj, state):
+        return [
+            {
+                'id': item.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.recipe_ingredients.all()
+        ]
+
+    def fast_image(self, obj, state):
+        return self.get_image(obj)
+
+    def fast_is_favorited(self, obj, state):
+        return obj.id in state['favorited']
+
+    def fast_is_in_shopping_cart(self, obj, state):
+        return obj.id in state['in_cart']
+
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = serializers.ListField(child=serializers.DictField(), write_only=True)
@@ -98,6 +209,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
@@ -107,11 +219,14 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             )
+        nutrition.recalculate_totals([recipe.id])
+        recipe.refresh_from_db(fields=['total_calories', 'total_cost'])
         return recipe
 
     def to_representation(self, instance):
         return RecipeListSerializer(instance, context=self.context).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
 
@@ -125,12 +240,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         instance.image = validated_data.get('image', instance.image)
         instance.save()
 
-        instance.recipe_ingredients.all().delete()
-        for ingredient in ingredients_data:
-            RecipeIngredient.objects.create(
-                recipe=instance,
-                ingredient_id=ingredient['id'],
-                amount=ingredient['amount']
-            )
+        with shopping_list.recipe_changing(instance.id):
+            instance.recipe_ingredients.all().delete()
+            for ingredient in ingredients_data:
+                RecipeIngredient.objects.create(
+                    recipe=instance,
+                    ingredient_id=ingredient['id'],
+                    amount=ingredient['amount']
+                )
+        nutrition.recalculate_totals([instance.id])
+        instance.refresh_from_db(fields=['total_calories', 'total_cost'])
 
         return instance
@@ -0,0 +1,150 @@
+"""Сводный список покупок, поддерживаемый инкрементально.
+
+ShoppingListItem хранит по каждому пользователю суммы ингредиентов корзины
+в базовых единицах. Изменения корзины и состава рецептов превращаются в
+дельты (пользователь, название, единица) -> количество и применяются
+за фиксированное число запросов; чтение списка — один проход по индексу
+(user, name, unit).
+
+Всё, что читает состав рецепта ради дельты, сначала блокирует строку
+рецепта (FOR NO KEY UPDATE): смена состава, добавление в корзину и
+удаление из неё для одного рецепта идут по очереди, и дельта считается
+от того состава, который действительно был до изменения. Порядок
+блокировок везде один: рецепт, затем пользователи.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Recipe, RecipeIngredient, ShoppingCart, ShoppingListItem
+from .nutrition import normalized_amount
+
+
+def recipe_amounts(recipe_id):
+    """Количества ингредиентов рецепта: (название, базовая единица) -> сумма."""
+    rows = (
+        RecipeIngredient.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient__name', 'ingredient__base_unit')
+        .annotate(total=Sum(normalized_amount()))
+        .order_by()
+    )
+    return {(name, unit): total for name, unit, total in rows}
+
+
+@transaction.atomic
+def apply(deltas):
+    """Применяет дельты {(user_id, name, unit): количество} к спискам."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    user_ids = sorted({user_id for user_id, _, _ in deltas})
+    # Блокировка пользователей (в порядке id) упорядочивает параллельные
+    # изменения одного списка и не даёт двум вставкам столкнуться.
+    list(get_user_model().objects.select_for_update().filter(id__in=user_ids).order_by('id').values_list('id'))
+
+    existing = {
+        (item.user_id, item.name, item.unit): item
+        for item in ShoppingListItem.objects.filter(
+            user_id__in=user_ids, name__in={name for _, name, _ in deltas}
+        )
+        if (item.user_id, item.name, item.unit) in deltas
+    }
+    changed, created, emptied = [], [], []
+    for key, delta in deltas.items():
+        item = existing.get(key)
+        if item is None:
+            if delta > 0:
+                created.append(ShoppingListItem(user_id=key[0], name=key[1], unit=key[2], amount=delta))
+            continue
+        item.amount += delta
+        (changed if item.amount > 0 else emptied).append(item)
+    ShoppingListItem.objects.bulk_update(changed, ['amount'])
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.filter(id__in=[item.id for item in emptied]).delete()
+
+
+def _for_users(user_ids, amounts, sign=1):
+    return {
+        (user_id, name, unit): sign * amount
+        for user_id in user_ids
+        for (name, unit), amount in amounts.items()
+    }
+
+
+def _lock_recipe(recipe_id):
+    # NO KEY UPDATE не мешает вставкам строк со ссылкой на рецепт
+    # (избранное, корзина), но упорядочивает правки его состава.
+    list(Recipe.objects.select_for_update(no_key=True).filter(pk=recipe_id).values_list('id'))
+
+
+@transaction.atomic
+def add_recipe(user_id, recipe_id):
+    _lock_recipe(recipe_id)
+    apply(_for_users([user_id], recipe_amounts(recipe_id)))
+
+
+@transaction.atomic
+def remove_recipe(user_id, recipe_id):
+    _lock_recipe(recipe_id)
+    apply(_for_users([user_id], recipe_amounts(recipe_id), sign=-1))
+
+
+@contextmanager
+def recipe_changing(recipe_id):
+    """Оборачивает смену состава рецепта: with recipe_changing(id): ...
+
+    Блокирует рецепт, запоминает состав до изменения и после блока
+    переносит разницу в списки всех, у кого рецепт в корзине.
+    """
+    with transaction.atomic():
+        _lock_recipe(recipe_id)
+        before = recipe_amounts(recipe_id)
+        yield
+        _apply_change(recipe_id, before)
+
+
+def _apply_change(recipe_id, before):
+    after = recipe_amounts(recipe_id)
+    difference = defaultdict(Decimal)
+    for key, amount in after.items():
+        difference[key] += amount
+    for key, amount in before.items():
+        difference[key] -= amount
+    if not any(difference.values()):
+        return
+    user_ids = ShoppingCart.objects.filter(recipe_id=recipe_id).values_list('user_id', flat=True)
+    apply(_for_users(user_ids, difference))
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Пересобирает списки с нуля из корзин. Возвращает число позиций."""
+    items = ShoppingListItem.objects.all()
+    # Одно условие на корзину: иначе Django сделает для него второй JOIN.
+    condition = {'recipe__shopping_cart__isnull': False}
+    if user_ids is not None:
+        user_ids = sorted(user_ids)
+        # Те же блокировки, что в apply(): дельты не вклиниваются в пересборку.
+        list(get_user_model().objects.select_for_update().filter(id__in=user_ids).order_by('id').values_list('id'))
+        items = items.filter(user_id__in=user_ids)
+        condition = {'recipe__shopping_cart__user_id__in': user_ids}
+    items.delete()
+    rows = (
+        RecipeIngredient.objects.filter(**condition)
+        .values_list('recipe__shopping_cart__user_id', 'ingredient__name', 'ingredient__base_unit')
+        .annotate(total=Sum(normalized_amount()))
+        .order_by()
+    )
+    created = ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, name=name, unit=unit, amount=total) for user_id, name, unit, total in rows),
+        batch_size=5000
+    )
+    return len(created)
+
+
+def items(user):
+    return ShoppingListItem.objects.filter(user=user).values('name', 'unit', 'amount')
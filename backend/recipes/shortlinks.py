@@ -0,0 +1,153 @@
+import atexit
+import logging
+import string
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+CACHE_PREFIX = 'shortlink:'
+MISSING = 0
+# Верхняя граница BigAutoField: коды больших чисел рецептами быть не могут.
+MAX_ID = 2 ** 63 - 1
+
+
+def encode(number):
+    if number < 0:
+        raise ValueError('Отрицательный id нельзя закодировать.')
+    if number == 0:
+        return ALPHABET[0]
+    chars = []
+    while number:
+        number, rem = divmod(number, BASE)
+        chars.append(ALPHABET[rem])
+    return ''.join(reversed(chars))
+
+
+def decode(code):
+    number = 0
+    for char in code:
+        index = ALPHABET.find(char)
+        if index < 0:
+            raise ValueError(f'Недопустимый символ в коде: {char!r}')
+        number = number * BASE + index
+    return number
+
+
+def resolve(code):
+    """Возвращает id рецепта по коду или None, не загружая сам рецепт."""
+    if not code or len(code) > settings.SHORT_LINK_MAX_LENGTH:
+        return None
+    try:
+        recipe_id = decode(code)
+    except ValueError:
+        return None
+    # Коды с ведущими нулями — псевдонимы канонического кода того же id.
+    if recipe_id > MAX_ID or encode(recipe_id) != code:
+        return None
+
+    key = f'{CACHE_PREFIX}{code}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    from .models import Recipe
+    exists = Recipe.objects.filter(pk=recipe_id).exists()
+    cache.set(
+        key,
+        recipe_id if exists else MISSING,
+        settings.SHORT_LINK_CACHE_TIMEOUT if exists else settings.SHORT_LINK_MISS_TIMEOUT
+    )
+    return recipe_id if exists else None
+
+
+def forget(recipe_id):
+    cache.delete(f'{CACHE_PREFIX}{encode(recipe_id)}')
+
+
+class HitCounter:
+    """Копит переходы по ссылкам в памяти и пишет их в БД пачками.
+
+    Пишет один фоновый поток: раз в flush_interval секунд или сразу,
+    как накопится flush_size переходов. Редирект никогда не ждёт записи
+    в базу. Поток запускается при первом переходе, в том числе заново
+    в дочернем процессе после fork.
+    """
+
+    def __init__(self, flush_size, flush_interval):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer = defaultdict(int)
+        self._pending = 0
+        self._wake = threading.Event()
+        self._thread = None
+
+    def hit(self, recipe_id):
+        with self._lock:
+            self._buffer[recipe_id] += 1
+            self._pending += 1
+            due = self._pending >= self.flush_size
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='shortlink-hits', daemon=True)
+                self._thread.start()
+        if due:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            batch = self._swap()
+        if batch:
+            self.write(batch)
+
+    def _swap(self):
+        batch, self._buffer = self._buffer, defaultdict(int)
+        self._pending = 0
+        return batch
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                batch = self._swap()
+            if not batch:
+                continue
+            try:
+                self.write(batch)
+            except DatabaseError:
+                logger.exception('Не удалось записать переходы по коротким ссылкам')
+                # Переходы возвращаются в буфер и уйдут со следующим сбросом.
+                with self._lock:
+                    for recipe_id, hits in batch.items():
+                        self._buffer[recipe_id] += hits
+                        self._pending += hits
+            finally:
+                connection.close()
+
+    @staticmethod
+    def write(batch):
+        from .models import Recipe, RecipeLinkStat
+        close_old_connections()
+        existing = set(Recipe.objects.filter(pk__in=batch).values_list('pk', flat=True))
+        RecipeLinkStat.objects.bulk_create(
+            [RecipeLinkStat(recipe_id=recipe_id) for recipe_id in existing],
+            ignore_conflicts=True
+        )
+        # Одно UPDATE на каждое уникальное значение прироста, а не на каждый рецепт.
+        by_increment = defaultdict(list)
+        for recipe_id in existing:
+            by_increment[batch[recipe_id]].append(recipe_id)
+        for increment, recipe_ids in by_increment.items():
+            RecipeLinkStat.objects.filter(recipe_id__in=recipe_ids).update(hits=F('hits') + increment)
+
+
+hit_counter = HitCounter(settings.SHORT_LINK_FLUSH_SIZE, settings.SHORT_LINK_FLUSH_INTERVAL)
+atexit.register(hit_counter.flush)
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import catalog, shopping_list, shortlinks
+from .models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from .tasks import recalculate_ingredient_totals, refresh_ingredient_shopping_lists, refresh_recipes
+
+
+@receiver(post_save, sender=Ingredient)
+def record_ingredient_save(sender, instance, created, **kwargs):
+    catalog.record_change(instance)
+    if not created:
+        # Итоги рецептов пересчитываются воркером, а не в запросе.
+        recalculate_ingredient_totals.delay(instance.id)
+        refresh_ingredient_shopping_lists.delay(instance.id)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    # pre_delete: строки состава ещё не удалены каскадом.
+    instance._recipe_ids = list(
+        RecipeIngredient.objects.filter(ingredient=instance).values_list('recipe_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def record_ingredient_delete(sender, instance, **kwargs):
+    catalog.record_change(instance, deleted=True)
+    recipe_ids = getattr(instance, '_recipe_ids', None)
+    if recipe_ids:
+        # Каскад удалил строки состава мимо recipe_changing: итоги и
+        # списки покупок этих рецептов пересчитываем заново.
+        refresh_recipes.delay(recipe_ids)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    # Сразу после фиксации, а не через outbox: иначе ссылка на удалённый
+    # рецепт редиректила бы до обработки события.
+    recipe_id = instance.id
+    transaction.on_commit(lambda: shortlinks.forget(recipe_id))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении рецепта его ингредиенты ещё на месте.
+    shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
@@ -0,0 +1,176 @@
+"""Похожие рецепты по пересечению ингредиентов.
+
+Рецепт — разреженный бинарный вектор id ингредиентов, похожесть —
+коэффициент Жаккара |A ∩ B| / |A ∪ B|. Полный пересчёт (build_all)
+выполняется офлайн пакетными разреженными произведениями X·Xᵀ на
+NumPy/SciPy; при изменении одного рецепта update_recipe пересчитывает
+его соседей и чужие списки, в которых он стоял или должен стоять.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .models import RecipeIngredient, RecipeNeighbor
+
+
+def load_matrix(chunk_size=10000):
+    """Читает RecipeIngredient потоком и строит CSR-матрицу рецепт × ингредиент."""
+    import numpy as np
+    from scipy import sparse
+
+    recipe_index, ingredient_index = {}, {}
+    rows, cols = [], []
+    pairs = RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id').iterator(chunk_size=chunk_size)
+    for recipe_id, ingredient_id in pairs:
+        rows.append(recipe_index.setdefault(recipe_id, len(recipe_index)))
+        cols.append(ingredient_index.setdefault(ingredient_id, len(ingredient_index)))
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(recipe_index), len(ingredient_index))
+    )
+    recipe_ids = np.empty(len(recipe_index), dtype=np.int64)
+    for recipe_id, index in recipe_index.items():
+        recipe_ids[index] = recipe_id
+    return matrix, recipe_ids
+
+
+def top_neighbors(matrix, top_k, batch_size):
+    """Выдаёт (строка, индексы соседей, оценки) пачками по batch_size строк."""
+    import numpy as np
+
+    sizes = np.asarray(matrix.getnnz(axis=1), dtype=np.float32)
+    transposed = matrix.T.tocsc()
+    for start in range(0, matrix.shape[0], batch_size):
+        intersections = (matrix[start:start + batch_size] @ transposed).tocsr()
+        for offset in range(intersections.shape[0]):
+            row = start + offset
+            begin, end = intersections.indptr[offset], intersections.indptr[offset + 1]
+            columns = intersections.indices[begin:end]
+            shared = intersections.data[begin:end]
+            keep = columns != row
+            columns, shared = columns[keep], shared[keep]
+            if not len(columns):
+                continue
+            scores = shared / (sizes[row] + sizes[columns] - shared)
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                columns, scores = columns[best], scores[best]
+            yield row, columns, scores
+
+
+def build_all(top_k=None, batch_size=1000, write_batch=5000):
+    """Полностью пересчитывает таблицу соседей. Возвращает число записей."""
+    top_k = top_k or settings.RECIPE_NEIGHBORS_TOP_K
+    matrix, recipe_ids = load_matrix()
+    written = 0
+    with transaction.atomic():
+        RecipeNeighbor.objects.all().delete()
+        buffer = []
+        for row, columns, scores in top_neighbors(matrix, top_k, batch_size):
+            recipe_id = int(recipe_ids[row])
+            buffer.extend(
+                RecipeNeighbor(recipe_id=recipe_id, neighbor_id=int(recipe_ids[column]), score=float(score))
+                for column, score in zip(columns, scores)
+            )
+            if len(buffer) >= write_batch:
+                RecipeNeighbor.objects.bulk_create(buffer)
+                written += len(buffer)
+                buffer = []
+        RecipeNeighbor.objects.bulk_create(buffer)
+        written += len(buffer)
+    return written
+
+
+def _trim(recipe_ids, top_k):
+    for recipe_id in recipe_ids:
+        stale = RecipeNeighbor.objects.filter(recipe_id=recipe_id).order_by('-score').values_list('id', flat=True)[top_k:]
+        RecipeNeighbor.objects.filter(id__in=list(stale)).delete()
+
+
+def _scores(recipe_id):
+    """Жаккар рецепта со всеми рецептами, у которых есть общий ингредиент.
+
+    Читает все строки RecipeIngredient с ингредиентами рецепта: для
+    популярных ингредиентов это заметная часть таблицы.
+    """
+    ingredient_ids = list(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list('ingredient_id', flat=True)
+    )
+    shared = dict(
+        RecipeIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+        .exclude(recipe_id=recipe_id)
+        .values('recipe_id').annotate(shared=Count('id'))
+        .values_list('recipe_id', 'shared')
+    )
+    sizes = dict(
+        RecipeIngredient.objects.filter(recipe_id__in=shared)
+        .values('recipe_id').annotate(size=Count('id'))
+        .values_list('recipe_id', 'size')
+    )
+    size = len(ingredient_ids)
+    return {
+        other_id: count / (size + sizes[other_id] - count)
+        for other_id, count in shared.items()
+    }
+
+
+def _replace(recipe_id, scores, top_k):
+    best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    RecipeNeighbor.objects.filter(recipe_id=recipe_id).delete()
+    RecipeNeighbor.objects.bulk_create(
+        RecipeNeighbor(recipe_id=recipe_id, neighbor_id=other_id, score=score)
+        for other_id, score in best
+    )
+
+
+def recompute(recipe_ids, top_k=None):
+    """Полностью пересчитывает списки соседей указанных рецептов."""
+    top_k = top_k or settings.RECIPE_NEIGHBORS_TOP_K
+    for recipe_id in recipe_ids:
+        scores = _scores(recipe_id)
+        with transaction.atomic():
+            _replace(recipe_id, scores, top_k)
+
+
+def update_recipe(recipe_id, top_k=None):
+    """Пересчитывает соседей одного рецепта и его место в списках соседей.
+
+    Если рецепт поднялся в чужом списке или попал в него, достаточно
+    вставки с обрезкой до top_k. Если он опустился или выпал из списка,
+    освободившееся место может занять рецепт, которого в списке не было,
+    поэтому такие списки пересчитываются полностью: после любых правок
+    хранимый top_k совпадает с результатом build_all.
+    """
+    top_k = top_k or settings.RECIPE_NEIGHBORS_TOP_K
+    scores = _scores(recipe_id)
+    previous = dict(RecipeNeighbor.objects.filter(neighbor_id=recipe_id).values_list('recipe_id', 'score'))
+    degraded = {other_id for other_id, score in previous.items() if scores.get(other_id, 0) < score}
+
+    # Текущая заполненность списков соседей у затронутых рецептов.
+    current = {
+        row['recipe_id']: (row['count'], row['lowest'])
+        for row in RecipeNeighbor.objects.filter(recipe_id__in=scores).exclude(neighbor_id=recipe_id)
+        .values('recipe_id').annotate(count=Count('id'), lowest=Min('score'))
+    }
+    reverse = {}
+    for other_id, score in scores.items():
+        if other_id in degraded:
+            continue
+        count, lowest = current.get(other_id, (0, None))
+        if count < top_k or score > lowest:
+            reverse[other_id] = score
+
+    with transaction.atomic():
+        _replace(recipe_id, scores, top_k)
+        RecipeNeighbor.objects.filter(neighbor_id=recipe_id).exclude(recipe_id__in=reverse).delete()
+        # Симметрично обновляем списки соседей затронутых рецептов.
+        RecipeNeighbor.objects.bulk_create(
+            [RecipeNeighbor(recipe_id=other_id, neighbor_id=recipe_id, score=score)
+             for other_id, score in reverse.items()],
+            update_conflicts=True,
+            unique_fields=('recipe', 'neighbor'),
+            update_fields=('score',)
+        )
+        _trim([other_id for other_id in reverse if current.get(other_id, (0,))[0] >= top_k], top_k)
+    recompute(sorted(degraded), top_k)
@@ -0,0 +1,101 @@
+"""Инкрементальная синхронизация рецептов для клиентов.
+
+Лента строится из RecipeChange: обработчик outbox добавляет запись на
+каждое событие рецепта и нумерует её из последовательности SEQUENCE.
+Номера выдаются в порядке фиксации, поэтому запись, которую клиент ещё
+не видел, не может оказаться позади уже отданной. Токен — номер и время
+последней отданной записи.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from events import sequences
+from .models import Recipe, RecipeChange
+
+SEQUENCE = 'recipes'
+
+
+class TokenExpired(Exception):
+    """Токен старше хранимых удалений: клиенту нужна полная загрузка."""
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_token(version, moment):
+    micros = (moment - EPOCH) // MICROSECOND
+    return base64.urlsafe_b64encode(f'v{version}.{micros}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """(номер, время) из токена; ValueError, если токен повреждён."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError('Некорректный токен.') from exc
+    if not raw.startswith('v'):
+        # Токен прежнего формата (время и id рецепта): нужна полная загрузка.
+        raise TokenExpired
+    try:
+        version, micros = raw[1:].split('.')
+        return int(version), EPOCH + int(micros) * MICROSECOND
+    except (ValueError, OverflowError) as exc:
+        raise ValueError('Некорректный токен.') from exc
+
+
+def record_change(recipe_id):
+    """Добавляет рецепт в ленту под следующим номером."""
+    with transaction.atomic():
+        version = sequences.allocate(SEQUENCE)
+        # Состояние читаем уже под блокировкой счётчика: события одного
+        # рецепта могут обрабатываться не по порядку, но последняя запись
+        # ленты всё равно отражает последнее зафиксированное состояние.
+        deleted = not Recipe.objects.filter(pk=recipe_id).exists()
+        RecipeChange.objects.create(version=version, recipe_id=recipe_id, deleted=deleted)
+
+
+def changes_since(token, limit):
+    """Изменения после token.
+
+    Возвращает (id изменённых рецептов по порядку, id удалённых,
+    следующий токен, есть ли ещё).
+    """
+    rows = RecipeChange.objects.all()
+    if token:
+        version, moment = decode_token(token)
+        if moment < timezone.now() - timedelta(days=settings.RECIPE_CHANGES_RETENTION_DAYS):
+            raise TokenExpired
+        rows = rows.filter(version__gt=version)
+    rows = list(rows.order_by('version').values_list('version', 'recipe_id', 'deleted', 'created')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], [], token, False
+    latest = {}
+    for _, recipe_id, deleted, _ in rows:
+        # Повторная запись рецепта переносит его в конец страницы.
+        latest.pop(recipe_id, None)
+        latest[recipe_id] = deleted
+    version, _, _, moment = rows[-1]
+    changed = [pk for pk, deleted in latest.items() if not deleted]
+    removed = [pk for pk, deleted in latest.items() if deleted]
+    return changed, removed, encode_token(version, moment), has_more
+
+
+def purge_changes():
+    """Удаляет старые записи об удалениях и записи, перекрытые более новыми.
+
+    Последняя запись живого рецепта остаётся, поэтому загрузка ленты с
+    начала по-прежнему возвращает все рецепты.
+    """
+    horizon = timezone.now() - timedelta(days=settings.RECIPE_CHANGES_RETENTION_DAYS)
+    superseded = RecipeChange.objects.filter(recipe_id=OuterRef('recipe_id'), version__gt=OuterRef('version'))
+    return RecipeChange.objects.filter(created__lt=horizon).filter(
+        Q(deleted=True) | Q(Exists(superseded))
+    ).delete()[0]
@@ -0,0 +1,59 @@
+from foodgram import storage
+from jobs.registry import task
+
+from . import recommendations, shopping_list, similarity, sync
+from .models import Recipe, ShoppingCart
+from .nutrition import recalculate_totals
+
+
+@task(max_attempts=3, backoff=60)
+def rebuild_recipe_neighbors():
+    return similarity.build_all()
+
+
+@task(max_attempts=3, backoff=60)
+def rebuild_recommendations():
+    return recommendations.build_cooccurrence()
+
+
+@task()
+def recalculate_ingredient_totals(ingredient_id, batch_size=500):
+    """Пересчитывает итоги рецептов после правки калорийности или цены ингредиента."""
+    recipe_ids = list(
+        Recipe.objects.filter(recipe_ingredients__ingredient_id=ingredient_id)
+        .distinct().order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(recipe_ids), batch_size):
+        recalculate_totals(recipe_ids[start:start + batch_size])
+
+
+@task()
+def refresh_ingredient_shopping_lists(ingredient_id):
+    """Пересобирает списки покупок, где встречается изменённый ингредиент."""
+    user_ids = list(
+        ShoppingCart.objects.filter(recipe__recipe_ingredients__ingredient_id=ingredient_id)
+        .values_list('user_id', flat=True).distinct()
+    )
+    if user_ids:
+        shopping_list.rebuild(user_ids)
+
+
+@task()
+def refresh_recipes(recipe_ids):
+    """Пересчитывает итоги и списки покупок рецептов, состав которых сменился без сигналов."""
+    recalculate_totals(recipe_ids)
+    user_ids = list(
+        ShoppingCart.objects.filter(recipe_id__in=recipe_ids).values_list('user_id', flat=True).distinct()
+    )
+    if user_ids:
+        shopping_list.rebuild(user_ids)
+
+
+@task()
+def purge_recipe_changes():
+    return sync.purge_changes()
+
+
+@task()
+def purge_orphaned_media():
+    return storage.purge_orphaned_media()
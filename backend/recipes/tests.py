@@ -0,0 +1,693 @@
+import base64
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from events.dispatcher import dispatch_batch
+from events.models import OutboxEvent
+from foodgram.querybudget import QueryBudget, QueryBudgetExceeded
+from foodgram.serializers import FastListSerializer
+from users.models import CustomUser, Subscription
+from . import backup, catalog, nutrition, recommendations, shopping_list, shortlinks, similarity, sync
+from .models import (
+    Favorite, ImportCheckpoint, Ingredient, IngredientChange, Recipe, RecipeChange, RecipeCooccurrence, RecipeIngredient,
+    RecipeLinkStat, RecipeNeighbor, ShoppingCart, ShoppingListItem
+)
+from .serializers import RecipeListSerializer
+from .views import RecipeViewSet
+
+
+class RecipeQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='cook', email='cook@example.org', password='x')
+        cls.ingredients = [Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г') for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def add_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'Рецепт {i}', text='Текст', cooking_time=10, image='recipes/images/x.png'
+            )
+            for ingredient in self.ingredients:
+                RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, amount=100)
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        self.add_recipes(1)
+        with QueryBudget() as single:
+            self.client.get('/api/recipes/')
+        self.add_recipes(9)
+        with QueryBudget(queries=single.count):
+            response = self.client.get('/api/recipes/')
+        results = response.json()['results']
+        self.assertEqual(response.json()['count'], 10)
+        self.assertEqual(len(results), 10)
+        for row in results:
+            self.assertIs(row['is_favorited'], True)
+            self.assertIs(row['is_in_shopping_cart'], True)
+            self.assertEqual(row['author']['id'], self.user.id)
+            self.assertEqual(sorted(item['name'] for item in row['ingredients']), [i.name for i in self.ingredients])
+
+    def test_declared_budgets_hold(self):
+        self.add_recipes(10)
+        recipe = Recipe.objects.first()
+        for action, url in (
+            ('list', '/api/recipes/'),
+            ('retrieve', f'/api/recipes/{recipe.id}/'),
+            ('shopping_list_summary', '/api/recipes/shopping_list/'),
+        ):
+            with self.subTest(action=action), QueryBudget(queries=RecipeViewSet.query_budgets[action].queries):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_runtime_mode_fails_view_over_budget(self):
+        self.add_recipes(1)
+        with mock.patch.object(RecipeViewSet, 'query_budgets', {'list': QueryBudget(queries=1)}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/recipes/')
+
+
+@override_settings(RECIPE_NEIGHBORS_TOP_K=2)
+class SimilarRecipesTests(TestCase):
+    # Наборы ингредиентов подобраны так, чтобы у каждого рецепта было
+    # больше кандидатов, чем мест в списке соседей.
+    INGREDIENT_SETS = ((0, 1, 2), (0, 1, 3), (0, 2, 3), (1, 2, 4), (0, 4), (2, 3, 4))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='chef', email='chef@example.org', password='x')
+        cls.ingredients = [Ingredient.objects.create(name=f'Продукт {i}', measurement_unit='г') for i in range(5)]
+
+    def setUp(self):
+        self.recipes = []
+        for index, ingredient_set in enumerate(self.INGREDIENT_SETS):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'Рецепт {index}', text='Текст', cooking_time=5, image='recipes/images/x.png'
+            )
+            self.set_ingredients(recipe, ingredient_set)
+            self.recipes.append(recipe)
+        similarity.build_all()
+
+    def set_ingredients(self, recipe, ingredient_set):
+        RecipeIngredient.objects.filter(recipe=recipe).delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=self.ingredients[i], amount=10) for i in ingredient_set
+        )
+
+    @staticmethod
+    def stored_scores():
+        """Оценки соседей по рецептам: при равных оценках id соседей могут различаться."""
+        scores = {}
+        for recipe_id, score in RecipeNeighbor.objects.values_list('recipe_id', 'score'):
+            scores.setdefault(recipe_id, []).append(round(score, 5))
+        return {recipe_id: sorted(values) for recipe_id, values in scores.items()}
+
+    def assert_matches_full_rebuild(self):
+        incremental = self.stored_scores()
+        similarity.build_all()
+        self.assertEqual(incremental, self.stored_scores())
+
+    def test_incremental_update_matches_full_rebuild(self):
+        for recipe, ingredient_set in ((self.recipes[0], (3,)), (self.recipes[1], (4,)), (self.recipes[0], (0, 1, 2))):
+            self.set_ingredients(recipe, ingredient_set)
+            similarity.update_recipe(recipe.id)
+            self.assert_matches_full_rebuild()
+
+    def test_deleted_recipe_slots_are_refilled(self):
+        dispatch_batch()
+        self.recipes[0].delete()
+        dispatch_batch()
+        self.assert_matches_full_rebuild()
+
+    def test_similar_limit_is_clamped_and_validated(self):
+        client = APIClient()
+        url = f'/api/recipes/{self.recipes[0].id}/similar/'
+        self.assertEqual(len(client.get(url, {'limit': -1}).json()), 1)
+        self.assertEqual(len(client.get(url, {'limit': 100}).json()), 2)
+        self.assertEqual(client.get(url, {'limit': 'много'}).status_code, 400)
+
+
+class IngredientCatalogTests(TestCase):
+    url = '/api/ingredients/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.ingredients = [Ingredient.objects.create(name=f'Соль {i}', measurement_unit='г') for i in range(2)]
+
+    def test_each_encoding_has_own_etag(self):
+        plain = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity')
+        packed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(packed.content), plain.content)
+        self.assertNotEqual(plain['ETag'], packed['ETag'])
+        for response in (plain, packed):
+            self.assertIn('Accept-Encoding', response['Vary'])
+        # Тег сжатого представления не подтверждает несжатое.
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity', HTTP_IF_NONE_MATCH=packed['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_weak_validator_gets_not_modified(self):
+        etag = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        for header in (etag, f'W/{etag}', f'"другой", W/{etag}'):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_delta_follows_versions(self):
+        version = catalog.current_version()
+        self.assertEqual(
+            list(IngredientChange.objects.values_list('version', flat=True)), list(range(1, version + 1))
+        )
+        removed_id = self.ingredients[0].id
+        self.ingredients[0].delete()
+        added = Ingredient.objects.create(name='Перец', measurement_unit='г')
+        response = self.client.get('/api/ingredients/changes/', {'since': version}).json()
+        self.assertEqual(response['version'], version + 2)
+        self.assertEqual(
+            [(row['id'], row['deleted']) for row in response['changes']],
+            [(removed_id, True), (added.id, False)]
+        )
+        self.assertEqual(self.client.get(self.url)['X-Catalog-Version'], str(version + 2))
+
+
+class RecipeFeedTests(TestCase):
+    url = '/api/recipes/changes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='baker', email='baker@example.org', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def add_recipe(self, name):
+        return Recipe.objects.create(
+            author=self.user, name=name, text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+
+    def feed(self, since=None, **params):
+        if since:
+            params['since'] = since
+        return self.client.get(self.url, params).json()
+
+    def test_changes_appear_once_published_and_in_order(self):
+        first, second = self.add_recipe('Первый'), self.add_recipe('Второй')
+        # До обработки outbox записей в ленте нет: номер выдаёт диспетчер.
+        self.assertEqual(self.feed()['changed'], [])
+        dispatch_batch()
+        page = self.feed(limit=1)
+        self.assertEqual([row['id'] for row in page['changed']], [first.id])
+        self.assertTrue(page['has_more'])
+        page = self.feed(page['next'])
+        self.assertEqual([row['id'] for row in page['changed']], [second.id])
+        token = page['next']
+
+        first.name = 'Первый, исправленный'
+        first.save()
+        second_id = second.id
+        second.delete()
+        dispatch_batch()
+        page = self.feed(token)
+        self.assertEqual([(row['id'], row['name']) for row in page['changed']], [(first.id, first.name)])
+        self.assertEqual(page['deleted'], [second_id])
+        self.assertEqual(self.feed(page['next'])['changed'], [])
+
+    def test_late_event_does_not_resurrect_deleted_recipe(self):
+        recipe = self.add_recipe('Удаляемый')
+        recipe_id = recipe.id
+        dispatch_batch()
+        recipe.delete()
+        dispatch_batch()
+        # Событие правки, обработанное после удаления, пишет фактическое состояние.
+        sync.record_change(recipe_id)
+        page = self.feed()
+        self.assertEqual(page['changed'], [])
+        self.assertEqual(page['deleted'], [recipe_id])
+
+    def test_expired_and_broken_tokens(self):
+        stale = sync.encode_token(1, timezone.now() - timedelta(days=365))
+        legacy = base64.urlsafe_b64encode(b'1700000000000000.5').decode().rstrip('=')
+        self.assertEqual(self.client.get(self.url, {'since': stale}).status_code, 410)
+        self.assertEqual(self.client.get(self.url, {'since': legacy}).status_code, 410)
+        self.assertEqual(self.client.get(self.url, {'since': 'мусор!'}).status_code, 400)
+
+    def test_purge_keeps_latest_row_of_live_recipes(self):
+        kept, removed = self.add_recipe('Живой'), self.add_recipe('Удалённый')
+        removed_id = removed.id
+        dispatch_batch()
+        kept.save()
+        removed.delete()
+        dispatch_batch()
+        RecipeChange.objects.update(created=timezone.now() - timedelta(days=365))
+        self.assertEqual(sync.purge_changes(), 3)
+        self.assertEqual(list(RecipeChange.objects.values_list('recipe_id', 'deleted')), [(kept.id, False)])
+        self.assertEqual([row['id'] for row in self.feed()['changed']], [kept.id])
+        self.assertNotIn(removed_id, self.feed()['deleted'])
+
+
+class ShortLinkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(username='linker', email='linker@example.org', password='x')
+        cls.recipe = Recipe.objects.create(
+            author=user, name='Рецепт', text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_only_canonical_codes_resolve(self):
+        code = shortlinks.encode(self.recipe.id)
+        self.assertEqual(shortlinks.resolve(code), self.recipe.id)
+        self.assertEqual(self.client.get(f'/s/{code}/').status_code, 302)
+        with self.assertNumQueries(0):
+            for alias in ('0' + code, '00' + code):
+                self.assertIsNone(shortlinks.resolve(alias))
+            self.assertEqual(self.client.get(f'/s/0{code}/').status_code, 404)
+
+    def test_deleted_recipe_link_stops_resolving_on_commit(self):
+        code = shortlinks.encode(self.recipe.id)
+        self.assertEqual(shortlinks.resolve(code), self.recipe.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        # Без обработки outbox: кеш сброшен при фиксации удаления.
+        self.assertIsNone(shortlinks.resolve(code))
+        self.assertEqual(self.client.get(f'/s/{code}/').status_code, 404)
+
+    def test_codes_beyond_bigint_are_rejected(self):
+        self.assertEqual(shortlinks.decode(shortlinks.encode(shortlinks.MAX_ID)), shortlinks.MAX_ID)
+        with self.assertNumQueries(0):
+            self.assertIsNone(shortlinks.resolve(shortlinks.encode(shortlinks.MAX_ID + 1)))
+            self.assertIsNone(shortlinks.resolve('z' * 11))
+
+
+class HitCounterTests(TransactionTestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='clicker', email='clicker@example.org', password='x')
+        self.recipe = Recipe.objects.create(
+            author=user, name='Рецепт', text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+
+    def wait_for_hits(self, expected, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stat = RecipeLinkStat.objects.filter(recipe=self.recipe).first()
+            if stat and stat.hits == expected:
+                return
+            time.sleep(0.02)
+        self.fail(f'За {timeout} с не записано {expected} переходов')
+
+    @staticmethod
+    def flusher_threads():
+        return [thread for thread in threading.enumerate() if thread.name == 'shortlink-hits']
+
+    def test_interval_flush_does_not_need_another_hit(self):
+        counter = shortlinks.HitCounter(flush_size=1000, flush_interval=0.05)
+        counter.hit(self.recipe.id)
+        counter.hit(self.recipe.id)
+        self.wait_for_hits(2)
+
+    def test_single_flusher_thread(self):
+        before = len(self.flusher_threads())
+        counter = shortlinks.HitCounter(flush_size=2, flush_interval=60)
+        for _ in range(10):
+            counter.hit(self.recipe.id)
+        self.wait_for_hits(10)
+        self.assertEqual(len(self.flusher_threads()), before + 1)
+
+
+class ImportRecipesTests(TestCase):
+    def setUp(self):
+        self.records = [
+            {
+                'id': 100 + index,
+                'author': {'email': 'importer@example.org', 'username': 'importer', 'first_name': 'И', 'last_name': 'И'},
+                'name': f'Импорт {index}',
+                'text': 'Текст',
+                'cooking_time': 5,
+                'image': 'recipes/images/x.png',
+                'created': '2026-01-01T00:00:00+00:00',
+                'ingredients': [{'name': 'Мука', 'measurement_unit': 'г', 'amount': 100}],
+            }
+            for index in range(5)
+        ]
+        self.content = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in self.records)
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(self.content)
+        self.addCleanup(os.remove, self.path)
+
+    def run_import(self, path=None, **options):
+        call_command('import_recipes', path or self.path, batch_size=2, stdout=io.StringIO(), **options)
+
+    def test_checkpoint_is_committed_with_batch(self):
+        calls = []
+
+        def fail_on_second_batch(records):
+            calls.append(records)
+            if len(calls) == 2:
+                raise RuntimeError('обрыв')
+            return backup.import_records(records)
+
+        with mock.patch(
+            'recipes.management.commands.import_recipes.import_records', side_effect=fail_on_second_batch
+        ), self.assertRaises(RuntimeError):
+            self.run_import()
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name=os.path.abspath(self.path)).done, 2)
+
+        self.run_import()
+        self.assertEqual(sorted(Recipe.objects.values_list('name', flat=True)), [r['name'] for r in self.records])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_reads_stdin(self):
+        with mock.patch('sys.stdin', io.StringIO(self.content)):
+            self.run_import('-')
+        self.assertEqual(Recipe.objects.count(), len(self.records))
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_imported_recipes_reach_outbox_and_feed(self):
+        self.run_import()
+        recipe_ids = set(Recipe.objects.values_list('id', flat=True))
+        self.assertEqual(
+            set(OutboxEvent.objects.filter(topic='recipe.created').values_list('aggregate_id', flat=True)), recipe_ids
+        )
+        dispatch_batch()
+        self.assertEqual(set(RecipeChange.objects.values_list('recipe_id', flat=True)), recipe_ids)
+
+    def test_taken_username_gets_suffix(self):
+        CustomUser.objects.create_user(username='importer', email='local@example.org', password='x')
+        CustomUser.objects.create_user(username='importer_2', email='local2@example.org', password='x')
+        self.records[1]['author'] = dict(self.records[0]['author'], email='second@example.org')
+        backup.import_records(self.records[:2])
+        self.assertEqual(
+            dict(CustomUser.objects.filter(email__in=('importer@example.org', 'second@example.org'))
+                 .values_list('email', 'username')),
+            {'importer@example.org': 'importer_3', 'second@example.org': 'importer_4'},
+        )
+        self.assertEqual(Recipe.objects.count(), 2)
+
+
+@override_settings(JOBS_EAGER=True)
+class ShoppingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(username='author', email='author@example.org', password='x')
+        cls.buyers = [
+            CustomUser.objects.create_user(username=f'buyer{i}', email=f'buyer{i}@example.org', password='x')
+            for i in range(2)
+        ]
+        cls.flour, cls.milk, cls.salt = (
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('Мука', 'г'), ('Молоко', 'мл'), ('Соль', 'г'))
+        )
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Блины', text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+        self.set_composition({self.flour: 200, self.milk: 500})
+        for buyer in self.buyers:
+            ShoppingCart.objects.create(user=buyer, recipe=self.recipe)
+
+    def set_composition(self, amounts):
+        with shopping_list.recipe_changing(self.recipe.id):
+            RecipeIngredient.objects.filter(recipe=self.recipe).delete()
+            for ingredient, amount in amounts.items():
+                RecipeIngredient.objects.create(recipe=self.recipe, ingredient=ingredient, amount=amount)
+
+    @staticmethod
+    def lists():
+        return sorted(ShoppingListItem.objects.values_list('user_id', 'name', 'unit', 'amount'))
+
+    def assert_matches_rebuild(self, expected):
+        incremental = self.lists()
+        shopping_list.rebuild()
+        self.assertEqual(incremental, self.lists())
+        self.assertEqual(
+            {(name, amount) for _, name, _, amount in incremental}, expected
+        )
+
+    def test_composition_change_reaches_every_cart(self):
+        self.set_composition({self.flour: 300, self.salt: 5})
+        self.assert_matches_rebuild({('Мука', 300), ('Соль', 5)})
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(f'/api/recipes/{self.recipe.id}/', {
+            'name': 'Блины', 'text': 'Текст', 'cooking_time': 5,
+            'ingredients': [{'id': self.milk.id, 'amount': 250}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_rebuild({('Молоко', 250)})
+
+    def test_cart_removal_takes_current_composition(self):
+        self.set_composition({self.flour: 100})
+        ShoppingCart.objects.get(user=self.buyers[0], recipe=self.recipe).delete()
+        self.assertEqual(self.lists(), [(self.buyers[1].id, 'Мука', 'г', 100)])
+
+    def test_ingredient_delete_refreshes_lists(self):
+        self.milk.delete()
+        self.assert_matches_rebuild({('Мука', 200)})
+        self.assertEqual(len(self.lists()), 2)
+
+
+class NutritionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='dietitian', email='diet@example.org', password='x')
+        cls.flour = Ingredient.objects.create(
+            name='Мука', measurement_unit='кг', calories=Decimal('3.64'), price=Decimal('0.05')
+        )
+        cls.spice = Ingredient.objects.create(name='Специя', measurement_unit='г', price=Decimal('2'))
+
+    def add_recipe(self, amounts):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Хлеб', text='Текст', cooking_time=5, image='recipes/images/x.png'
+        )
+        for ingredient, amount in amounts.items():
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, amount=amount)
+        nutrition.recalculate_totals([recipe.id])
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_missing_data_makes_total_unknown(self):
+        complete = self.add_recipe({self.flour: 1})
+        self.assertEqual((complete.total_calories, complete.total_cost), (Decimal('3640.00'), Decimal('50.00')))
+        partial = self.add_recipe({self.flour: 1, self.spice: 2})
+        self.assertIsNone(partial.total_calories)
+        self.assertEqual(partial.total_cost, Decimal('54.00'))
+
+        ShoppingCart.objects.create(user=self.user, recipe=complete)
+        self.assertEqual(nutrition.shopping_list_totals(self.user), {'calories': Decimal('3640.00'), 'cost': Decimal('50.00')})
+        ShoppingCart.objects.create(user=self.user, recipe=partial)
+        self.assertEqual(nutrition.shopping_list_totals(self.user), {'calories': None, 'cost': Decimal('104.00')})
+
+    def test_recalculation_query_count_and_events(self):
+        recipes = [self.add_recipe({self.flour: index + 1}) for index in range(5)]
+        ids = [recipe.id for recipe in recipes]
+        OutboxEvent.objects.all().delete()
+        with self.assertNumQueries(2):
+            # Итоги не изменились: ни UPDATE, ни событий.
+            nutrition.recalculate_totals(ids)
+        Ingredient.objects.filter(pk=self.flour.pk).update(price=Decimal('0.1'))
+        with self.assertNumQueries(4):
+            nutrition.recalculate_totals(ids)
+        self.assertEqual(
+            sorted(OutboxEvent.objects.filter(topic='recipe.totals_changed').values_list('aggregate_id', flat=True)), ids
+        )
+        self.assertEqual(Recipe.objects.get(pk=ids[-1]).total_cost, Decimal('500.00'))
+
+    def test_manual_unit_factor_survives_save(self):
+        cup = Ingredient(name='Рис', measurement_unit='стакан', unit_factor=Decimal('200'))
+        cup.save()
+        cup.refresh_from_db()
+        self.assertEqual((cup.base_unit, cup.unit_factor), ('мл', Decimal('200')))
+        self.assertEqual(self.flour.unit_factor, Decimal('1000'))
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='picky', email='picky@example.org', password='x')
+        cls.ingredients = [Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г') for i in range(2)]
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Суп', text='Текст', cooking_time=15, image='recipes/images/x.png'
+        )
+        for ingredient in cls.ingredients:
+            RecipeIngredient.objects.create(recipe=cls.recipe, ingredient=ingredient, amount=50)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def get_row(self, params):
+        return self.client.get('/api/recipes/', params).json()['results'][0]
+
+    def test_only_requested_fields(self):
+        full = self.get_row({})
+        self.assertIn('text', full)
+        self.assertEqual(self.get_row({'fields': 'id,name, cooking_time'}), {
+            'id': self.recipe.id, 'name': 'Суп', 'cooking_time': 15,
+        })
+        self.assertEqual(
+            self.client.get(f'/api/recipes/{self.recipe.id}/', {'fields': 'name'}).json(), {'name': 'Суп'}
+        )
+
+    def test_nested_fields_collapse_unless_expanded(self):
+        ingredient_ids = [ingredient.id for ingredient in self.ingredients]
+        row = self.get_row({'fields': 'id,author,ingredients'})
+        self.assertEqual(row['author'], self.user.id)
+        self.assertEqual(sorted(row['ingredients']), ingredient_ids)
+
+        full = self.get_row({})
+        row = self.get_row({'fields': 'author,ingredients', 'expand': 'author,ingredients'})
+        self.assertEqual(row, {'author': full['author'], 'ingredients': full['ingredients']})
+
+    def test_sparse_request_runs_fewer_queries(self):
+        with QueryBudget() as full:
+            self.client.get('/api/recipes/')
+        with QueryBudget(queries=full.count - 1):
+            self.client.get('/api/recipes/', {'fields': 'id,name'})
+
+
+class FastListSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(username='chef', email='chef@example.org', password='x')
+        cls.reader = CustomUser.objects.create_user(username='guest', email='guest@example.org', password='x')
+        Subscription.objects.create(subscriber=cls.reader, author=cls.author)
+        ingredients = [Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г') for i in range(3)]
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {i}', text='Текст', cooking_time=5, image='recipes/images/x.png'
+            )
+            for ingredient in ingredients[:i + 1]:
+                RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, amount=10)
+        Favorite.objects.create(user=cls.reader, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+
+    def serialize(self, params, user):
+        request = Request(APIRequestFactory().get('/api/recipes/', params))
+        request.user = user
+        queryset = Recipe.objects.select_related('author').prefetch_related('recipe_ingredients__ingredient')
+        context = {'request': request}
+        slow = ListSerializer(queryset, child=RecipeListSerializer(), context=context).data
+        fast = RecipeListSerializer(queryset, many=True, context=context).data
+        return slow, fast
+
+    def test_fast_path_matches_drf_output(self):
+        self.assertIsInstance(RecipeListSerializer(many=True), FastListSerializer)
+        for params in (
+            {}, {'fields': 'id,author,ingredients,is_favorited'},
+            {'fields': 'author,is_in_shopping_cart', 'expand': 'author'},
+        ):
+            for user in (self.reader, AnonymousUser()):
+                with self.subTest(params=params, user=user):
+                    slow, fast = self.serialize(params, user)
+                    self.assertEqual(fast, slow)
+        slow, fast = self.serialize({}, self.reader)
+        self.assertEqual(sum(row['is_favorited'] for row in fast), 1)
+        self.assertIs(fast[0]['author']['is_subscribed'], True)
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(username='baker', email='baker@example.org', password='x')
+        cls.first = CustomUser.objects.create_user(username='first', email='first@example.org', password='x')
+        cls.second = CustomUser.objects.create_user(username='second', email='second@example.org', password='x')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {i}', text='Текст', cooking_time=5, image='recipes/images/x.png'
+            )
+            for i in range(5)
+        ]
+        for recipe in cls.recipes[:3]:
+            Favorite.objects.create(user=cls.first, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.first, recipe=cls.recipes[3])
+        for recipe in cls.recipes[:2]:
+            Favorite.objects.create(user=cls.second, recipe=recipe)
+
+    def test_cooccurrence_scores(self):
+        recipe = self.recipes
+        self.assertEqual(recommendations.build_cooccurrence(), 12)
+        scores = dict(
+            ((row.recipe_id, row.related_id), row.score) for row in RecipeCooccurrence.objects.all()
+        )
+        self.assertAlmostEqual(scores[recipe[0].id, recipe[1].id], 1.0)
+        self.assertAlmostEqual(scores[recipe[0].id, recipe[2].id], 2 ** -0.5)
+        # Корзина весит меньше избранного.
+        self.assertAlmostEqual(scores[recipe[0].id, recipe[3].id], 0.5)
+        self.assertNotIn((recipe[0].id, recipe[4].id), scores)
+        recommendations.build_cooccurrence(top_n=1)
+        self.assertEqual(RecipeCooccurrence.objects.filter(recipe=recipe[0]).count(), 1)
+
+    def test_recommended_endpoint(self):
+        call_command('build_recommendations', stdout=io.StringIO())
+        client = APIClient()
+        self.assertEqual(client.get('/api/recipes/recommended/').status_code, 401)
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.first).key)
+        with QueryBudget() as baseline:
+            response = client.get('/api/recipes/recommended/')
+        # Ранжированные кандидаты, затем добор свежими рецептами.
+        self.assertEqual([row['id'] for row in response.json()], [self.recipes[3].id, self.recipes[4].id])
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.second).key)
+        # Число запросов не зависит от длины истории пользователя.
+        with QueryBudget(queries=baseline.count):
+            response = client.get('/api/recipes/recommended/')
+        # Избранное пользователя в выдачу не попадает.
+        self.assertEqual(
+            [row['id'] for row in response.json()], [self.recipes[2].id, self.recipes[3].id, self.recipes[4].id]
+        )
+        response = client.get('/api/recipes/recommended/', {'limit': 1})
+        self.assertEqual([row['id'] for row in response.json()], [self.recipes[2].id])
+
+    def test_without_history_returns_fresh_recipes(self):
+        recipes = recommendations.recommend(self.author, 10)
+        self.assertEqual(recipes, [])
+        reader = CustomUser.objects.create_user(username='new', email='new@example.org', password='x')
+        self.assertEqual(len(recommendations.recommend(reader, 3)), 3)
+
+    @override_settings(RECOMMENDATION_SEED_LIMIT=20)
+    def test_own_favorites_do_not_crowd_out_candidates(self):
+        favorites = [
+            Recipe.objects.create(
+                author=self.author, name=f'Любимый {i}', text='Текст', cooking_time=5, image='recipes/images/x.png'
+            )
+            for i in range(20)
+        ]
+        fan = CustomUser.objects.create_user(username='fan', email='fan@example.org', password='x')
+        for recipe in favorites:
+            Favorite.objects.create(user=fan, recipe=recipe)
+        for i in range(10):
+            other = CustomUser.objects.create_user(username=f'other{i}', email=f'other{i}@example.org', password='x')
+            Favorite.objects.create(user=other, recipe=favorites[0])
+            Favorite.objects.create(user=other, recipe=self.recipes[i % 5])
+        recommendations.build_cooccurrence()
+        recipes = recommendations.recommend(fan, 10)
+        self.assertEqual({recipe.id for recipe in recipes}, {recipe.id for recipe in self.recipes})
+        self.assertFalse({recipe.id for recipe in recipes} & {recipe.id for recipe in favorites})
@@ -1,15 +1,20 @@
-from collections import defaultdict
-
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.urls import reverse
 from django_filters.rest_framework import FilterSet, CharFilter, BooleanFilter, DjangoFilterBackend
 from rest_framework import viewsets, permissions, filters, status, generics
 from rest_framework.decorators import action
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import Recipe, Favorite, Ingredient
+from foodgram.querybudget import QueryBudget, QueryBudgetMixin, query_budget
+from foodgram.serializers import get_sparse_fields
+from foodgram.throttling import ConcurrencyLimit, scoped_throttles
+from .models import Recipe, Favorite, Ingredient, RecipeNeighbor
 from .models import ShoppingCart
+from . import catalog, nutrition, recommendations, shopping_list, shortlinks, sync
 from .permissions import IsAuthorOrReadOnly
 from .serializers import RecipeListSerializer, RecipeCreateSerializer, RecipeMinifiedSerializer, IngredientSerializer
 
@@ -41,11 +46,51 @@ class RecipeFilter(FilterSet):
         return queryset.exclude(favorites__user=user)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     filterset_class = RecipeFilter
     permission_classes = (permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
+    # Колонки Recipe, которые можно не читать, если поле не запрошено.
+    sparse_columns = ('name', 'image', 'text', 'cooking_time', 'total_calories', 'total_cost')
+    # Число запросов не должно зависеть от размера страницы.
+    query_budgets = {
+        'list': QueryBudget(queries=10, duration_ms=500),
+        'retrieve': QueryBudget(queries=8, duration_ms=300),
+        'recommended': QueryBudget(queries=10, duration_ms=500),
+        'similar': QueryBudget(queries=4, duration_ms=300),
+        'changes': QueryBudget(queries=5, duration_ms=1000),
+        'shopping_list_summary': QueryBudget(queries=4, duration_ms=300),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'changes'):
+            return queryset
+
+        requested, expand = get_sparse_fields(self.request)
+        if requested is None:
+            return queryset.select_related('author').prefetch_related('recipe_ingredients__ingredient')
+
+        columns = {'id', 'author'} | (requested & set(self.sparse_columns))
+        queryset = queryset.only(*columns)
+        if 'author' in requested and 'author' in expand:
+            queryset = queryset.select_related('author')
+        if 'ingredients' in requested:
+            if 'ingredients' in expand:
+                queryset = queryset.prefetch_related('recipe_ingredients__ingredient')
+            else:
+                queryset = queryset.prefetch_related('recipe_ingredients')
+        return queryset
+
+    def get_throttles(self):
+        if self.action == 'create':
+            return [throttle() for throttle in scoped_throttles('recipe_create')]
+        return super().get_throttles()
+
+    def create(self, request, *args, **kwargs):
+        with ConcurrencyLimit('recipe_create'):
+            return super().create(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -58,8 +103,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         recipe = self.get_object()
-        short_link = f"https://foodgram.example.org/s/{recipe.id}"
-        return Response({"short-link": short_link})
+        path = reverse('short-link', args=[shortlinks.encode(recipe.id)])
+        return Response({"short-link": request.build_absolute_uri(path)})
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def recommended(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), settings.RECOMMENDATION_MAX_LIMIT)
+        except ValueError:
+            limit = 10
+        recipes = recommendations.recommend(request.user, max(limit, 1))
+        serializer = RecipeListSerializer(recipes, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        recipe = self.get_object()
+        try:
+            limit = int(request.query_params.get('limit', 6))
+        except ValueError:
+            return Response({'limit': 'Должно быть целым числом.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.RECIPE_NEIGHBORS_TOP_K))
+        neighbor_ids = list(
+            RecipeNeighbor.objects.filter(recipe=recipe).order_by('-score')
+            .values_list('neighbor_id', flat=True)[:limit]
+        )
+        recipes = Recipe.objects.in_bulk(neighbor_ids)
+        serializer = RecipeMinifiedSerializer(
+            [recipes[neighbor_id] for neighbor_id in neighbor_ids if neighbor_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Рецепты, созданные, изменённые или удалённые после ?since=<токен>."""
+        try:
+            limit = min(int(request.query_params.get('limit', settings.RECIPE_CHANGES_LIMIT)),
+                        settings.RECIPE_CHANGES_LIMIT)
+        except ValueError:
+            limit = settings.RECIPE_CHANGES_LIMIT
+        try:
+            changed, deleted, token, has_more = sync.changes_since(request.query_params.get('since'), max(limit, 1))
+        except ValueError:
+            return Response({'since': 'Некорректный токен синхронизации.'}, status=status.HTTP_400_BAD_REQUEST)
+        except sync.TokenExpired:
+            return Response({'since': 'Токен устарел, требуется полная синхронизация.'}, status=status.HTTP_410_GONE)
+        recipes = self.get_queryset().in_bulk(changed)
+        serializer = self.get_serializer([recipes[pk] for pk in changed if pk in recipes], many=True)
+        return Response({'next': token, 'has_more': has_more, 'changed': serializer.data, 'deleted': deleted})
+
+    @action(detail=False, methods=['get'], url_path='shopping_list', permission_classes=[permissions.IsAuthenticated])
+    def shopping_list_summary(self, request):
+        totals = nutrition.shopping_list_totals(request.user)
+        return Response({
+            'items': [
+                {'name': row['name'], 'measurement_unit': row['unit'], 'amount': row['amount']}
+                for row in shopping_list.items(request.user)
+            ],
+            'total_calories': totals['calories'],
+            'total_cost': totals['cost'],
+        })
 
     @action(detail=True, methods=['post', 'delete'], permission_classes=[permissions.IsAuthenticated])
     def favorite(self, request, pk=None):
@@ -96,20 +201,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Рецепта нет в списке покупок.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def short_link_redirect(request, code):
+    # Обычная Django-вьюха: без DRF-обвязки и без загрузки рецепта.
+    recipe_id = shortlinks.resolve(code)
+    if recipe_id is None:
+        raise Http404
+    shortlinks.hit_counter.hit(recipe_id)
+    return HttpResponseRedirect(f"/recipes/{recipe_id}")
+
+
+@query_budget(queries=4, duration_ms=500)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@throttle_classes(scoped_throttles('shopping_cart_download'))
+@ConcurrencyLimit('shopping_cart_download')
 def download_shopping_cart(request):
-    # Собираем ингредиенты для всех рецептов из списка покупок текущего пользователя.
-    ingredients = defaultdict(lambda: 0)
-    cart_items = ShoppingCart.objects.filter(user=request.user).select_related('recipe')
-    # Проходим по каждому рецепту и суммируем ингредиенты.
-    for cart_item in cart_items:
-        for ri in cart_item.recipe.recipe_ingredients.all():
-            key = (ri.ingredient.name, ri.ingredient.measurement_unit)
-            ingredients[key] += ri.amount
-
-    # Формируем текстовый файл: каждая строка — "Ингредиент (единица измерения) — общее количество"
-    lines = [f"{name} ({unit}) — {amount}" for (name, unit), amount in ingredients.items()]
+    # Сводный список уже посчитан (recipes.shopping_list), единицы приведены к базовым.
+    lines = [
+        f"{row['name']} ({row['unit']}) — {nutrition.format_amount(row['amount'])}"
+        for row in shopping_list.items(request.user)
+    ]
+    totals = nutrition.shopping_list_totals(request.user)
+    if totals['calories'] is not None:
+        lines.append(f"Калорийность: {nutrition.format_amount(totals['calories'])} ккал")
+    if totals['cost'] is not None:
+        lines.append(f"Стоимость: {nutrition.format_amount(totals['cost'])}")
     content = "\n".join(lines)
 
     response = HttpResponse(content, content_type="text/plain")
@@ -125,16 +241,49 @@ class IngredientFilter(FilterSet):
         fields = ['name']
 
 
-class IngredientListView(generics.ListAPIView):
+class IngredientListView(QueryBudgetMixin, generics.ListAPIView):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = None
+    query_budgets = {'get': QueryBudget(queries=4, duration_ms=500)}
+
+    def get_throttles(self):
+        if not self.request.query_params.get('name'):
+            return [throttle() for throttle in scoped_throttles('ingredient_catalog')]
+        return super().get_throttles()
+
+    def list(self, request, *args, **kwargs):
+        # Весь каталог отдаём из заранее собранного и сжатого снимка с ETag.
+        if not request.query_params.get('name'):
+            with ConcurrencyLimit('ingredient_catalog'):
+                return catalog.snapshot_response(request)
+        # Справочник read-only и большой: строим словари прямо из values(),
+        # минуя создание моделей и поля сериализатора. Вывод тот же.
+        fields = IngredientSerializer.Meta.fields
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(list(queryset.values(*fields)))
+
+
+class IngredientChangesView(APIView):
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response({'since': 'Версия должна быть неотрицательным целым числом.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        changes, version, has_more = catalog.changes_since(since, settings.INGREDIENT_CATALOG_DELTA_LIMIT)
+        return Response({'version': version, 'has_more': has_more, 'changes': changes})
 
 
-class IngredientDetailView(generics.RetrieveAPIView):
+class IngredientDetailView(QueryBudgetMixin, generics.RetrieveAPIView):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    query_budgets = {'get': QueryBudget(queries=3, duration_ms=200)}
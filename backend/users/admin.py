@@ -2,5 +2,17 @@ from django.contrib import admin
 from .models import CustomUser, Subscription
 from django.contrib.auth.admin import UserAdmin
 
-admin.site.register(CustomUser, UserAdmin)
-admin.site.register(Subscription)
\ No newline at end of file
+from foodgram.paginators import LargeTableAdminMixin
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
+    pass
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'subscriber', 'author', 'created')
+    list_select_related = ('subscriber', 'author')
+    autocomplete_fields = ('subscriber', 'author')
+    search_fields = ('subscriber__username', 'author__username')
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from foodgram.hashers import _mark_pool_thread
+
+
+class Command(BaseCommand):
+    help = 'Измеряет число входов в секунду для каждого алгоритма хеширования паролей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', nargs='+', choices=list(settings.HASHERS), default=list(settings.HASHERS))
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, settings.PASSWORD_HASHING_WORKERS])
+        parser.add_argument('--duration', type=float, default=3.0, help='Длительность замера, с')
+
+    def handle(self, *args, **options):
+        for name in options['hashers']:
+            hasher = import_string(settings.HASHERS[name])()
+            encoded = hasher.encode('correct horse battery staple', hasher.salt())
+            params = ', '.join(f'{key}={value}' for key, value in hasher.safe_summary(encoded).items()
+                               if key not in ('algorithm', 'salt', 'hash'))
+            results = []
+            for threads in options['threads']:
+                rate = self._measure(hasher, encoded, threads, options['duration'])
+                results.append(f'{threads} пот.: {rate:7.1f} входов/с ({rate / threads:6.1f} на ядро)')
+            self.stdout.write(f'{name:<7} [{params}]')
+            for line in results:
+                self.stdout.write(f'    {line}')
+
+    @staticmethod
+    def _measure(hasher, encoded, threads, duration):
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            count = 0
+            while time.perf_counter() < deadline:
+                hasher.verify('correct horse battery staple', encoded)
+                count += 1
+            return count
+
+        # Потоки помечены как потоки пула: verify выполняется в них напрямую.
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads, initializer=_mark_pool_thread) as pool:
+            total = sum(pool.map(lambda _: worker(), range(threads)))
+        return total / (time.perf_counter() - start)
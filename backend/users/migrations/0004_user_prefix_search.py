@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-19 02:26
+
+from django.db import migrations, models
+
+PREFIX_SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # istartswith на PostgreSQL строится как UPPER(поле::text) LIKE UPPER(...):
+    # индекс нужен ровно по этому выражению и с text_pattern_ops.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in PREFIX_SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS users_customuser_{field}_prefix_idx '
+            f'ON users_customuser (UPPER({field}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in PREFIX_SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS users_customuser_{field}_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_first_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='last_name',
+            field=models.CharField(max_length=30),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
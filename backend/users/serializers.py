@@ -1,22 +1,47 @@
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from foodgram.fields import Base64ImageField
+from foodgram.serializers import FastListSerializer, FastPathMixin, file_url
 from .models import CustomUser, Subscription
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(FastPathMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'avatar', 'is_subscribed')
+        list_serializer_class = FastListSerializer
 
     def get_is_subscribed(self, obj):
+        # Значение из аннотации queryset (см. users.views.with_subscription_flag).
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        if request and request.user.is_authenticated and request.user.pk != obj.pk:
             return Subscription.objects.filter(subscriber=request.user, author=obj).exists()
         return False
 
+    def prepare_rows(self, rows):
+        request = self.context.get('request')
+        subscribed = set()
+        annotated = rows and hasattr(rows[0], 'is_subscribed')
+        if request and request.user.is_authenticated and 'is_subscribed' in self.fields and not annotated:
+            subscribed = set(
+                Subscription.objects.filter(
+                    subscriber=request.user, author_id__in={user.id for user in rows}
+                ).values_list('author_id', flat=True)
+            )
+        return {'request': request, 'subscribed': subscribed}
+
+    def fast_avatar(self, obj, state):
+        return file_url(obj.avatar, state['request'])
+
+    def fast_is_subscribed(self, obj, state):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in state['subscribed']
+
 
 class CustomUserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -30,43 +55,6 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserWithRecipesSerializer(serializers.ModelSerializer):
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-    is_subscribed = serializers.SerializerMethodField()
-
-    class Meta:
-        model = CustomUser
-        fields = (
-            'id', 'username', 'email', 'first_name', 'last_name',
-            'avatar', 'is_subscribed', 'recipes', 'recipes_count'
-        )
-
-    def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit') if request else None
-        queryset = obj.recipes.all()
-        if recipes_limit is not None:
-            try:
-                limit = int(recipes_limit)
-                queryset = queryset[:limit]
-            except ValueError:
-                pass
-        from recipes.serializers import RecipeMinifiedSerializer
-        serializer = RecipeMinifiedSerializer(queryset, many=True, context=self.context)
-        return serializer.data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            from .models import Subscription
-            return Subscription.objects.filter(subscriber=request.user, author=obj).exists()
-        return False
-
-
 class SetAvatarSerializer(serializers.Serializer):
     avatar = Base64ImageField()
 
@@ -0,0 +1,148 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from foodgram.querybudget import QueryBudget
+from recipes.models import Recipe
+from .models import CustomUser, Subscription
+from .serializers import CustomUserSerializer
+from .views import SubscriptionListView
+
+
+class UserQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', email='reader@example.org', password='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def add_authors(self, count, recipes=3):
+        start = CustomUser.objects.count()
+        authors = []
+        for i in range(start, start + count):
+            author = CustomUser.objects.create_user(username=f'author{i}', email=f'author{i}@example.org', password='x')
+            Subscription.objects.create(subscriber=self.user, author=author)
+            for j in range(recipes):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {i}.{j}', text='Текст', cooking_time=5, image='recipes/images/x.png'
+                )
+            authors.append(author)
+        return authors
+
+    def test_list_and_subscriptions_query_count_is_constant(self):
+        self.add_authors(1)
+        with QueryBudget() as users:
+            self.client.get('/api/users/')
+        with QueryBudget() as subscriptions:
+            self.client.get('/api/users/subscriptions/')
+        self.add_authors(8)
+        with QueryBudget(queries=users.count):
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.json()['count'], 10)
+        self.assertEqual([row['is_subscribed'] for row in response.json()['results']], [False] + [True] * 9)
+        with QueryBudget(queries=subscriptions.count):
+            response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.json()['count'], 9)
+
+    def test_subscriptions_content(self):
+        author, = self.add_authors(1, recipes=4)
+        newest = list(author.recipes.order_by('-created').values_list('id', flat=True))
+        response = self.client.get('/api/users/subscriptions/', {'recipes_limit': 2})
+        row, = response.json()['results']
+        self.assertEqual(row['id'], author.id)
+        self.assertIs(row['is_subscribed'], True)
+        self.assertEqual(row['recipes_count'], 4)
+        self.assertEqual([recipe['id'] for recipe in row['recipes']], newest[:2])
+        self.assertEqual(set(row['recipes'][0]), {'id', 'name', 'image', 'cooking_time'})
+
+        response = self.client.get('/api/users/subscriptions/', {'fields': 'id,recipes'})
+        self.assertEqual(response.json()['results'], [{'id': author.id, 'recipes': newest}])
+        response = self.client.get('/api/users/subscriptions/', {'recipes_limit': -1})
+        self.assertEqual(response.json()['results'][0]['recipes'], [])
+
+    def test_recipes_limit_is_applied_in_database(self):
+        self.add_authors(3, recipes=5)
+        view = SubscriptionListView()
+        view.request = view.initialize_request(
+            APIRequestFactory().get('/api/users/subscriptions/', {'recipes_limit': 2})
+        )
+        view.request.user = self.user
+        authors = list(view.get_queryset())
+        self.assertEqual([len(author._prefetched_objects_cache['recipes']) for author in authors], [2, 2, 2])
+        self.assertEqual([author.recipes_count for author in authors], [5, 5, 5])
+
+    def test_fast_list_matches_drf_output(self):
+        self.add_authors(2, recipes=1)
+        request = Request(APIRequestFactory().get('/api/users/'))
+        request.user = self.user
+        queryset = CustomUser.objects.order_by('id')
+        context = {'request': request}
+        fast = CustomUserSerializer(queryset, many=True, context=context).data
+        self.assertEqual(fast, ListSerializer(queryset, child=CustomUserSerializer(), context=context).data)
+        self.assertEqual([row['is_subscribed'] for row in fast], [False, True, True])
+
+
+class UserDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='reader', email='reader@example.org', password='x')
+        for i in range(7):
+            CustomUser.objects.create_user(
+                username=f'bob{i}', email=f'bob{i}@example.org', password='x',
+                first_name='Anna' if i % 2 else 'Zoe', last_name='Smith',
+            )
+        cls.followed = CustomUser.objects.get(username='bob3')
+        Subscription.objects.create(subscriber=cls.user, author=cls.followed)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def usernames(self, response):
+        return [row['username'] for row in response.json()['results']]
+
+    def test_prefix_search(self):
+        response = self.client.get('/api/users/', {'search': 'BOB1'})
+        self.assertEqual(self.usernames(response), ['bob1'])
+        response = self.client.get('/api/users/', {'search': 'aN'})
+        self.assertEqual(self.usernames(response), ['bob1', 'bob3', 'bob5'])
+        # Ищем только по началу строки.
+        self.assertEqual(self.client.get('/api/users/', {'search': 'ob'}).json()['count'], 0)
+
+    def test_cursor_pages_walk_the_whole_list(self):
+        expected = list(CustomUser.objects.order_by('id').values_list('username', flat=True))
+        seen = []
+        response = self.client.get('/api/users/', {'cursor': '', 'limit': 3})
+        self.assertNotIn('count', response.json())
+        while True:
+            seen.extend(self.usernames(response))
+            if response.json()['next'] is None:
+                break
+            with self.assertNumQueries(2):
+                # Аутентификация и сама страница, без COUNT(*).
+                response = self.client.get(response.json()['next'])
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/users/', {'limit': 3, 'offset': 3}).json()['count'], 8)
+
+    def test_subscription_flag(self):
+        rows = self.client.get('/api/users/', {'search': 'bob'}).json()['results']
+        self.assertEqual([row['username'] for row in rows if row['is_subscribed']], ['bob3'])
+        self.assertIs(self.client.get(f'/api/users/{self.followed.id}/').json()['is_subscribed'], True)
+        with self.assertNumQueries(1):
+            self.assertIs(self.client.get('/api/users/me/').json()['is_subscribed'], False)
+        rows = APIClient().get('/api/users/').json()['results']
+        self.assertFalse(any(row['is_subscribed'] for row in rows))
+
+
+class AvatarTests(TestCase):
+    def test_avatar_upload_validates_image(self):
+        user = CustomUser.objects.create_user(username='painter', email='painter@example.org', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        response = self.client.put('/api/users/me/avatar/', {'avatar': 'data:image/png;base64,AAAA'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('avatar', response.json())
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Value, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny
@@ -6,17 +8,44 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from foodgram.pagination import KeysetOrLimitOffsetPagination
+from foodgram.querybudget import QueryBudget, QueryBudgetMixin
+from foodgram.serializers import get_sparse_fields
+from recipes.models import Recipe
+from recipes.serializers import UserWithRecipesSerializer, get_recipes_limit
 from .models import CustomUser, Subscription
 from .serializers import CustomUserCreateSerializer, SetAvatarSerializer, SetPasswordSerializer
 from .serializers import (
     CustomUserSerializer
 )
-from .serializers import UserWithRecipesSerializer
 
 
-class CustomUserListCreateView(generics.ListCreateAPIView):
-    queryset = CustomUser.objects.all()
+def with_subscription_flag(queryset, user):
+    """Добавляет is_subscribed подзапросом EXISTS вместо запроса на строку."""
+    if not user.is_authenticated:
+        return queryset.annotate(is_subscribed=Value(False))
+    return queryset.annotate(
+        is_subscribed=Exists(Subscription.objects.filter(subscriber=user, author=OuterRef('pk')))
+    )
+
+
+class CustomUserListCreateView(QueryBudgetMixin, generics.ListCreateAPIView):
     permission_classes = (AllowAny,)
+    pagination_class = KeysetOrLimitOffsetPagination
+    prefix_search_fields = ('username', 'first_name', 'last_name')
+    query_budgets = {'get': QueryBudget(queries=4, duration_ms=300)}
+
+    def get_queryset(self):
+        queryset = CustomUser.objects.order_by('id')
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            # Поиск по началу строки: на PostgreSQL использует индексы
+            # UPPER(поле) text_pattern_ops из миграции users.0004.
+            condition = Q()
+            for field in self.prefix_search_fields:
+                condition |= Q(**{f'{field}__istartswith': search})
+            queryset = queryset.filter(condition)
+        return with_subscription_flag(queryset, self.request.user)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -24,9 +53,10 @@ class CustomUserListCreateView(generics.ListCreateAPIView):
         return CustomUserSerializer
 
 
-class CurrentUserView(generics.RetrieveAPIView):
+class CurrentUserView(QueryBudgetMixin, generics.RetrieveAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticated,)
+    query_budgets = {'get': QueryBudget(queries=2, duration_ms=200)}
 
     def get_object(self):
         return self.request.user
@@ -35,12 +65,39 @@ class CurrentUserView(generics.RetrieveAPIView):
 User = get_user_model()
 
 
-class SubscriptionListView(generics.ListAPIView):
+class SubscriptionListView(QueryBudgetMixin, generics.ListAPIView):
     serializer_class = UserWithRecipesSerializer
     permission_classes = [IsAuthenticated]
+    query_budgets = {'get': QueryBudget(queries=8, duration_ms=500)}
+
+    # Колонки пользователя, которые можно не читать, если поле не запрошено.
+    sparse_columns = ('username', 'email', 'first_name', 'last_name', 'avatar')
 
     def get_queryset(self):
-        return User.objects.filter(subscribers__subscriber=self.request.user)
+        # Счётчик, флаг подписки и рецепты всех авторов страницы — без
+        # запросов на каждого автора.
+        queryset = (
+            User.objects.filter(subscribers__subscriber=self.request.user)
+            .annotate(recipes_count=Count('recipes', distinct=True), is_subscribed=Value(True))
+            .order_by('id')
+        )
+        requested, expand = get_sparse_fields(self.request)
+        if requested is not None:
+            queryset = queryset.only('id', *(requested & set(self.sparse_columns)))
+        if requested is None or 'recipes' in requested:
+            columns = ('id', 'author', 'name', 'image', 'cooking_time')
+            if requested is not None and 'recipes' not in expand:
+                columns = ('id', 'author')
+            recipes = Recipe.objects.only(*columns).order_by('-created', '-id')
+            limit = get_recipes_limit(self.request)
+            if limit is not None:
+                # Предел применяется в БД: с каждого автора читается не
+                # больше limit свежих рецептов.
+                recipes = recipes.annotate(
+                    row=Window(RowNumber(), partition_by=F('author'), order_by=(F('created').desc(), F('id').desc()))
+                ).filter(row__lte=limit)
+            queryset = queryset.prefetch_related(Prefetch('recipes', queryset=recipes))
+        return queryset
 
 
 
@@ -66,9 +123,12 @@ class SubscribeView(APIView):
         return Response({'error': 'Вы не подписаны на данного пользователя.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserDetailView(generics.RetrieveAPIView):
-    queryset = CustomUser.objects.all()
+class UserDetailView(QueryBudgetMixin, generics.RetrieveAPIView):
     serializer_class = CustomUserSerializer
+    query_budgets = {'get': QueryBudget(queries=3, duration_ms=200)}
+
+    def get_queryset(self):
+        return with_subscription_flag(CustomUser.objects.all(), self.request.user)
 
 
 class UserAvatarView(APIView):
@@ -86,7 +146,10 @@ class UserAvatarView(APIView):
     def delete(self, request):
         user = request.user
         if user.avatar:
-            user.avatar.delete(save=True)
+            # Файл может быть общим с другими записями, поэтому удаляем
+            # только ссылку; файл без владельцев уберёт purge_orphaned_media.
+            user.avatar = None
+            user.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 